@@ -0,0 +1,144 @@
+"""Contrôle d'admission par classe de routes, devant la base de données.
+
+Quand SQL Server ralentit, chaque requête acceptée garde une session du pool
+jusqu'à son délai d'expiration et la latence grimpe pour toutes les routes.
+Chaque classe de routes a ici son propre nombre de requêtes en cours et une
+file d'attente bornée :
+
+    auth     /token, /users (bcrypt + lecture de users)
+    heavy    agrégats et analyses (abandon_annee, driver_points, result_year...)
+    lookup   listes de référence et recherches (detail_pilote, info_gp...)
+
+Une requête qui trouve la file de sa classe pleine, ou qui attend plus de
+F1_ADMISSION_QUEUE_TIMEOUT secondes, reçoit tout de suite un 503 avec
+Retry-After : la surcharge d'une classe ne déborde pas sur les autres. Les
+sondes (/, /health, /metrics, /pool_stats) et la documentation ne passent pas
+par le contrôle. F1_ADMISSION=0 le désactive.
+"""
+import asyncio
+import os
+import time
+
+from fastapi.responses import JSONResponse
+
+import hashing
+import metrics
+
+ADMISSION_ENABLED = os.getenv("F1_ADMISSION", "1") == "1"
+QUEUE_TIMEOUT = float(os.getenv("F1_ADMISSION_QUEUE_TIMEOUT", "5"))
+RETRY_AFTER = int(os.getenv("F1_ADMISSION_RETRY_AFTER", "1"))
+
+# (requêtes en cours, places dans la file) par défaut ; le total en cours
+# (4 + 4 + 7) ne dépasse pas la taille du pool (F1_POOL_SIZE + F1_POOL_MAX_OVERFLOW = 15).
+# auth : deux requêtes par thread bcrypt (l'une hache pendant que l'autre lit users) ;
+# c'est cette file, et non hashing.py, qui déleste les connexions en surcharge
+DEFAULT_LIMITS = {
+    "auth": (2 * hashing.HASH_WORKERS or 4, 32),
+    "heavy": (4, 64),
+    "lookup": (7, 128),
+}
+
+HEAVY_ROUTES = {
+    "/driver_points", "/driver_points/batch", "/abandon_annee", "/pole_position_annee",
+    "/constructor_victory", "/nbr_course_circuit", "/nbr_win_driver", "/result_year",
+    "/result_pilote_constructeur",
+}
+AUTH_ROUTES = {"/token", "/users"}
+EXEMPT_ROUTES = {"/", "/health", "/metrics", "/pool_stats", "/docs", "/redoc", "/openapi.json"}
+
+
+class Overloaded(Exception):
+    def __init__(self, route_class):
+        super().__init__(route_class)
+        self.route_class = route_class
+
+
+class Limiter:
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self):
+        """Prend une place ; renvoie le temps passé dans la file, ou lève Overloaded."""
+        if not self._semaphore.locked():
+            # Place libre : acquire ne suspend pas, aucune autre requête ne passe entre-temps
+            await self._semaphore.acquire()
+            self.active += 1
+            return 0.0
+        if self.waiting >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.name)
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(self.name)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return time.perf_counter() - start
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+def _limit(route_class, index):
+    name = f"F1_ADMISSION_{route_class.upper()}_{'LIMIT' if index == 0 else 'QUEUE'}"
+    return int(os.getenv(name, str(DEFAULT_LIMITS[route_class][index])))
+
+
+limiters = {route_class: Limiter(route_class, _limit(route_class, 0), _limit(route_class, 1))
+            for route_class in DEFAULT_LIMITS}
+
+
+def route_class(path):
+    """Classe de la route `path`, ou None si elle échappe au contrôle."""
+    if not ADMISSION_ENABLED or path in EXEMPT_ROUTES:
+        return None
+    if path in AUTH_ROUTES:
+        return "auth"
+    if path in HEAVY_ROUTES:
+        return "heavy"
+    return "lookup"
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI : la place est gardée jusqu'à la fin de l'envoi du corps
+    (exports NDJSON/CSV compris), et rendue même si le client se déconnecte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Les requêtes CORS préliminaires (OPTIONS) ne touchent pas la base
+        name = route_class(scope["path"]) if scope["type"] == "http" and scope["method"] != "OPTIONS" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        limiter = limiters[name]
+        try:
+            metrics.add_time("queue", await limiter.acquire())
+        except Overloaded:
+            scope["f1_admission_rejected"] = name  # étiquette de route pour /metrics
+            response = JSONResponse(status_code=503, content={"detail": f"Server overloaded ({name} requests)"},
+                                    headers={"Retry-After": str(RETRY_AFTER)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+def stats():
+    return {name: {"limit": limiter.limit, "queue_size": limiter.queue_size, "active": limiter.active,
+                   "waiting": limiter.waiting, "rejected": limiter.rejected}
+            for name, limiter in limiters.items()}
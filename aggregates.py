@@ -0,0 +1,232 @@
+"""Tables d'agrégats matérialisées, reconstruites après chaque chargement.
+
+Les routes de main.py lisent ces tables au lieu de refaire les GROUP BY sur
+results/qualifying à chaque appel. script2.py appelle refresh_aggregates à la
+fin du chargement ; `python aggregates.py` les reconstruit à la demande.
+"""
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, text
+
+metadata = MetaData()
+
+agg_driver_wins = Table(
+    "agg_driver_wins", metadata,
+    Column("driverId", Integer, primary_key=True),
+    Column("forename", String(255)),
+    Column("surname", String(255)),
+    Column("victories", Integer),
+)
+
+agg_constructor_wins = Table(
+    "agg_constructor_wins", metadata,
+    Column("constructorId", Integer, primary_key=True),
+    Column("name", String(255)),
+    Column("wins", Integer),
+)
+
+agg_driver_poles = Table(
+    "agg_driver_poles", metadata,
+    Column("driverId", Integer, primary_key=True),
+    Column("forename", String(255)),
+    Column("surname", String(255)),
+    Column("pole_positions", Integer),
+)
+
+agg_circuit_races = Table(
+    "agg_circuit_races", metadata,
+    Column("circuitId", Integer, primary_key=True),
+    Column("name", String(255)),
+    Column("country", String(255)),
+    Column("race_count", Integer),
+)
+
+# Catégorie de chaque statut de fin de course (table de correspondance)
+agg_status_category = Table(
+    "agg_status_category", metadata,
+    Column("statusId", Integer, primary_key=True),
+    Column("category", String(32)),
+)
+
+# Nombre de résultats par année et par catégorie de statut
+agg_year_status_category = Table(
+    "agg_year_status_category", metadata,
+    Column("year", Integer, primary_key=True),
+    Column("category", String(32), primary_key=True),
+    Column("result_count", Integer),
+)
+
+agg_driver_season_points = Table(
+    "agg_driver_season_points", metadata,
+    Column("driverId", Integer, primary_key=True),
+    Column("year", Integer, primary_key=True),
+    Column("total_points", Float),
+)
+
+# Carrière de chaque pilote chez chaque constructeur (/result_pilote_constructeur) ;
+# la clé primaire commence par constructorId : la route est une recherche indexée
+agg_driver_constructor_tenure = Table(
+    "agg_driver_constructor_tenure", metadata,
+    Column("constructorId", Integer, primary_key=True),
+    Column("driverId", Integer, primary_key=True),
+    Column("first_year", Integer),
+    Column("last_year", Integer),
+    Column("seasons", Integer),
+    Column("starts", Integer),
+    Column("points", Float),
+    Column("wins", Integer),
+)
+
+# Catégories de statut pour /abandon_annee, dans l'ordre d'évaluation (la première
+# qui correspond l'emporte, sinon 'other'). Motifs LIKE, insensibles à la casse
+# avec la collation SQL Server par défaut comme avec SQLite. 'brakes' garde le
+# motif d'origine de la route ('%Brakes%').
+STATUS_CATEGORIES = [
+    ("finished", ["Finished", "+% Lap%"]),
+    ("brakes", ["%Brakes%"]),
+    ("accident", ["%Accident%", "%Collision%", "Spun off", "Damage", "Debris"]),
+    ("fuel", ["%Fuel%"]),
+    ("engine", ["%Engine%", "Power Unit", "ERS", "Turbo", "Supercharger", "Overheating", "Radiator",
+                "Cooling system", "%Oil%", "%Water%", "Crankshaft", "Spark plugs", "Ignition", "Injection",
+                "Distributor", "Magneto", "Power loss", "Exhaust"]),
+    ("transmission", ["Gearbox", "Transmission", "Clutch", "Differential", "Driveshaft", "Drivetrain",
+                      "Halfshaft", "CV joint", "Axle", "Launch control"]),
+    ("electrical", ["Electrical", "Electronics", "Battery", "Alternator"]),
+    ("hydraulics", ["Hydraulics", "Pneumatics"]),
+    ("tyres", ["Tyre%", "Puncture", "Wheel%"]),
+    ("chassis", ["Suspension", "Steering", "Track rod", "Chassis", "%wing%", "Undertray", "Handling",
+                 "Vibrations", "Throttle", "%Seat%", "Safety belt"]),
+    ("driver", ["Physical", "%Injur%", "Illness", "Driver unwell"]),
+    ("disqualified", ["Disqualified", "Excluded", "Underweight"]),
+    ("not_started", ["Did not qualify", "Did not prequalify", "107% Rule", "Withdrew", "Not restarted"]),
+]
+STATUS_CATEGORY_NAMES = [name for name, _ in STATUS_CATEGORIES] + ["other"]
+
+
+def _status_category_case():
+    whens = []
+    for name, patterns in STATUS_CATEGORIES:
+        condition = " OR ".join(f"status LIKE '{pattern}'" for pattern in patterns)
+        whens.append(f"WHEN {condition} THEN '{name}'")
+    return "CASE " + " ".join(whens) + " ELSE 'other' END"
+
+
+# Requête de reconstruction de chaque table (mêmes agrégats que les routes d'origine)
+REFRESH_QUERIES = {
+    "agg_driver_wins": """
+        INSERT INTO agg_driver_wins (driverId, forename, surname, victories)
+        SELECT d.driverId, d.forename, d.surname, COUNT(*)
+        FROM results r
+        JOIN drivers d ON r.driverId = d.driverId
+        WHERE r.position = 1
+        GROUP BY d.driverId, d.forename, d.surname
+    """,
+    "agg_constructor_wins": """
+        INSERT INTO agg_constructor_wins (constructorId, name, wins)
+        SELECT co.constructorId, co.name, COUNT(*)
+        FROM results r
+        JOIN constructors co ON r.constructorId = co.constructorId
+        WHERE r.position = 1
+        GROUP BY co.constructorId, co.name
+    """,
+    "agg_driver_poles": """
+        INSERT INTO agg_driver_poles (driverId, forename, surname, pole_positions)
+        SELECT d.driverId, d.forename, d.surname, COUNT(*)
+        FROM qualifying q
+        JOIN drivers d ON q.driverId = d.driverId
+        WHERE q.position = 1
+        GROUP BY d.driverId, d.forename, d.surname
+    """,
+    "agg_circuit_races": """
+        INSERT INTO agg_circuit_races (circuitId, name, country, race_count)
+        SELECT c.circuitId, c.name, c.country, COUNT(*)
+        FROM circuits c
+        JOIN races r ON c.circuitId = r.circuitId
+        GROUP BY c.circuitId, c.name, c.country
+    """,
+    # starts compte les résultats avec des points renseignés, comme nbr_gp d'origine
+    "agg_driver_constructor_tenure": """
+        INSERT INTO agg_driver_constructor_tenure
+            (constructorId, driverId, first_year, last_year, seasons, starts, points, wins)
+        SELECT res.constructorId, res.driverId, MIN(r.year), MAX(r.year), COUNT(DISTINCT r.year),
+            COUNT(res.points), SUM(res.points), SUM(CASE WHEN res.position = 1 THEN 1 ELSE 0 END)
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        GROUP BY res.constructorId, res.driverId
+    """,
+    "agg_status_category": f"""
+        INSERT INTO agg_status_category (statusId, category)
+        SELECT statusId, {_status_category_case()}
+        FROM status
+    """,
+    # Résultats sans statut connu comptés en 'unknown' : le total par année reste
+    # celui de la route d'origine
+    "agg_year_status_category": """
+        INSERT INTO agg_year_status_category (year, category, result_count)
+        SELECT r.year, COALESCE(sc.category, 'unknown'), COUNT(*)
+        FROM results res
+        JOIN races r ON res.raceId = r.raceId
+        LEFT JOIN agg_status_category sc ON sc.statusId = res.statusId
+        GROUP BY r.year, COALESCE(sc.category, 'unknown')
+    """,
+    "agg_driver_season_points": """
+        INSERT INTO agg_driver_season_points (driverId, year, total_points)
+        SELECT res.driverId, r.year, SUM(res.points)
+        FROM races r
+        JOIN results res ON r.raceId = res.raceId
+        GROUP BY res.driverId, r.year
+    """,
+}
+
+
+def create_aggregate_tables(engine):
+    metadata.create_all(bind=engine)
+
+
+def refresh_aggregates(engine):
+    """Vide et reconstruit toutes les tables d'agrégats dans une seule transaction."""
+    create_aggregate_tables(engine)
+    with engine.begin() as connection:
+        for table, query in REFRESH_QUERIES.items():
+            connection.execute(text(f"DELETE FROM {table}"))
+            connection.execute(text(query))
+    print("Tables d'agrégats reconstruites.")
+
+
+def aggregates_empty(engine):
+    # Une table vide suffit : une base existante reçoit les tables ajoutées depuis
+    # son dernier chargement vides (create_aggregate_tables)
+    with engine.connect() as connection:
+        return any(connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() == 0
+                   for table in REFRESH_QUERIES)
+
+
+def verify_aggregates(engine):
+    """Compare chaque route lue sur les agrégats avec sa requête d'origine ({nom: bool})."""
+    import queries
+
+    checks = {
+        "pole_position_annee": (queries.POLE_POSITION_ANNEE, queries.POLE_POSITION_ANNEE_AGG, {}),
+        "constructor_victory": (queries.CONSTRUCTOR_VICTORY, queries.CONSTRUCTOR_VICTORY_AGG, {}),
+        "nbr_course_circuit": (queries.NBR_COURSE_CIRCUIT, queries.NBR_COURSE_CIRCUIT_AGG, {}),
+        "driver_points": (queries.DRIVER_POINTS, queries.DRIVER_POINTS_AGG, {"forename": "Alain", "surname": "Prost"}),
+        "abandon_annee": (queries.ABANDON_ANNEE, queries.ABANDON_ANNEE_AGG, {"categories": ["brakes"]}),
+        "result_pilote_constructeur": (queries.RESULT_PILOTE_CONSTRUCTEUR, queries.RESULT_PILOTE_CONSTRUCTEUR_AGG,
+                                       {"name": "Ferrari"}),
+    }
+    report = {}
+    with engine.connect() as connection:
+        for name, (original, aggregated, params) in checks.items():
+            expected = sorted(tuple(row) for row in connection.execute(original, params))
+            actual = sorted(tuple(row) for row in connection.execute(aggregated, params))
+            report[name] = expected == actual
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from database import engine
+
+    if "--verify" in sys.argv:
+        for name, ok in verify_aggregates(engine).items():
+            print(f"{name}: {'OK' if ok else 'DIFFERENT'}")
+    else:
+        refresh_aggregates(engine)
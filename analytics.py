@@ -0,0 +1,383 @@
+"""Moteur d'analyse en mémoire pour les routes de lecture de main.py.
+
+Les tables sont chargées une seule fois dans des colonnes NumPy. Les clés
+étrangères sont converties en indices entiers (position de la ligne dans la
+table cible, -1 si la jointure échoue), ce qui permet de répondre aux GROUP BY
+avec np.bincount au lieu d'un aller-retour vers SQL Server.
+
+Chaque méthode renvoie une liste de tuples dans le même ordre de colonnes que
+la requête SQL correspondante de queries.py : main.py construit ses dicts de
+la même manière dans les deux cas, et compare_with_sql peut s'en servir comme
+oracle.
+
+Les colonnes sont partagées entre workers par un instantané mappé en mémoire
+(snapshot.py) : le premier processus qui charge une version l'écrit, les
+suivants l'ouvrent en lecture seule sans relire la base.
+"""
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # numpy n'est pas installé : le moteur reste désactivé
+    np = None
+
+from sqlalchemy import text
+
+import queries
+from driver_index import normalize
+import snapshot
+import versioning
+
+ANALYTICS_ENABLED = os.getenv("F1_ANALYTICS_MEMORY", "0") == "1"
+
+# Colonnes chargées pour chaque table (uniquement celles utilisées par les routes)
+TABLE_COLUMNS = {
+    "drivers": ["driverId", "forename", "surname"],
+    "constructors": ["constructorId", "name"],
+    "circuits": ["circuitId", "name", "country"],
+    "races": ["raceId", "year", "circuitId", "name", "date"],
+    "results": ["resultId", "raceId", "driverId", "constructorId", "position", "points", "statusId"],
+    "qualifying": ["qualifyId", "driverId", "position"],
+    "status": ["statusId", "status"],
+    "agg_status_category": ["statusId", "category"],
+}
+
+
+def _to_int(values):
+    # Convertit une colonne (éventuellement VARCHAR avec '\N') en int32, 0 pour NULL
+    out = np.zeros(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        try:
+            out[i] = int(float(v))
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+def _to_float(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _to_str(values):
+    return np.array(["" if v is None else str(v) for v in values], dtype=object)
+
+
+def _encode(fk, pk):
+    # Indice de la ligne de `pk` correspondant à chaque valeur de `fk`, -1 si absente
+    if len(pk) == 0:
+        return np.full(len(fk), -1, dtype=np.int64)
+    order = np.argsort(pk, kind="stable")
+    pos = np.clip(np.searchsorted(pk[order], fk), 0, len(pk) - 1)
+    codes = order[pos]
+    codes[pk[codes] != fk] = -1
+    return codes
+
+
+def _fold(value):
+    # Les collations SQL Server par défaut ignorent la casse
+    return str(value).casefold()
+
+
+class AnalyticsEngine:
+    def __init__(self, tables):
+        self.tables = tables
+        drivers = tables["drivers"]
+        constructors = tables["constructors"]
+        circuits = tables["circuits"]
+        races = tables["races"]
+        results = tables["results"]
+        qualifying = tables["qualifying"]
+        status = tables["status"]
+
+        # Clés étrangères encodées en indices de lignes
+        self.race_circuit = _encode(races["circuitId"], circuits["circuitId"])
+        self.result_race = _encode(results["raceId"], races["raceId"])
+        self.result_driver = _encode(results["driverId"], drivers["driverId"])
+        self.result_constructor = _encode(results["constructorId"], constructors["constructorId"])
+        self.result_status = _encode(results["statusId"], status["statusId"])
+        self.qualifying_driver = _encode(qualifying["driverId"], drivers["driverId"])
+
+        # Année de chaque résultat (0 si la course n'existe pas)
+        self.result_season = np.where(self.result_race >= 0, races["year"][self.result_race], 0)
+
+        # Code commun aux pilotes homonymes (les requêtes groupent par nom)
+        pairs = [(f, s) for f, s in zip(drivers["forename"], drivers["surname"])]
+        _, self.driver_name_code = np.unique(np.array([f + "\x00" + s for f, s in pairs], dtype=object),
+                                             return_inverse=True)
+        self.driver_forename_folded = np.array([_fold(v) for v in drivers["forename"]], dtype=object)
+        self.driver_surname_folded = np.array([_fold(v) for v in drivers["surname"]], dtype=object)
+        # Même normalisation que constructor_index.py (accents, casse, tirets) : le
+        # nom saisi donne le même résultat qu'en SQL
+        self.constructor_name_normalized = np.array([normalize(v) for v in constructors["name"]], dtype=object)
+
+    @classmethod
+    def from_engine(cls, engine):
+        return cls(cls.read_tables(engine))
+
+    @classmethod
+    def read_tables(cls, engine):
+        tables = {}
+        with engine.connect() as connection:
+            for table, columns in TABLE_COLUMNS.items():
+                rows = connection.execute(text(f"SELECT {', '.join(columns)} FROM {table}")).fetchall()
+                raw = list(zip(*rows)) if rows else [() for _ in columns]
+                tables[table] = dict(zip(columns, raw))
+        return cls._typed(tables)
+
+    @staticmethod
+    def _typed(raw):
+        # Typage des colonnes brutes renvoyées par la base
+        text_columns = {"forename", "surname", "name", "country", "status", "category"}
+        tables = {}
+        for table, columns in raw.items():
+            typed = {}
+            for column, values in columns.items():
+                if column in text_columns:
+                    typed[column] = _to_str(values)
+                elif column == "points":
+                    typed[column] = _to_float(values)
+                elif column == "date":
+                    typed[column] = np.array(values, dtype=object)
+                else:
+                    typed[column] = _to_int(values)
+            tables[table] = typed
+        return tables
+
+    def _ranked(self, counts, ids):
+        # Groupes non vides triés par nombre décroissant, puis par identifiant
+        selected = np.nonzero(counts)[0]
+        order = np.lexsort((ids[selected], -counts[selected]))
+        return selected[order]
+
+    def nbr_win_driver(self, with_ids=False):
+        # with_ids=True ajoute driverId en tête (clé de pagination)
+        drivers = self.tables["drivers"]
+        mask = (self.tables["results"]["position"] == 1) & (self.result_driver >= 0)
+        counts = np.bincount(self.result_driver[mask], minlength=len(drivers["driverId"]))
+        ranked = self._ranked(counts, drivers["driverId"])
+        if with_ids:
+            return [(int(drivers["driverId"][i]), drivers["forename"][i], drivers["surname"][i], int(counts[i]))
+                    for i in ranked]
+        return [(drivers["forename"][i], drivers["surname"][i], int(counts[i])) for i in ranked]
+
+    def constructor_victory(self):
+        constructors = self.tables["constructors"]
+        mask = (self.tables["results"]["position"] == 1) & (self.result_constructor >= 0)
+        counts = np.bincount(self.result_constructor[mask], minlength=len(constructors["constructorId"]))
+        return [(constructors["name"][i], int(counts[i]))
+                for i in self._ranked(counts, constructors["constructorId"])]
+
+    def pole_position_annee(self):
+        drivers = self.tables["drivers"]
+        mask = (self.tables["qualifying"]["position"] == 1) & (self.qualifying_driver >= 0)
+        counts = np.bincount(self.qualifying_driver[mask], minlength=len(drivers["driverId"]))
+        return [(drivers["forename"][i], drivers["surname"][i], int(counts[i]))
+                for i in self._ranked(counts, drivers["driverId"])]
+
+    def nbr_course_circuit(self):
+        circuits = self.tables["circuits"]
+        codes = self.race_circuit[self.race_circuit >= 0]
+        counts = np.bincount(codes, minlength=len(circuits["circuitId"]))
+        return [(circuits["name"][i], circuits["country"][i], int(counts[i]))
+                for i in self._ranked(counts, circuits["circuitId"])]
+
+    def abandon_annee(self, categories=("brakes",)):
+        # Catégorie de chaque statut lue dans agg_status_category (aggregates.py)
+        statuses = self.tables["status"]["statusId"]
+        if len(statuses) == 0:
+            return []
+        lookup = self.tables["agg_status_category"]
+        codes = _encode(statuses, lookup["statusId"])
+        selected = (codes >= 0) & np.isin(lookup["category"][np.maximum(codes, 0)], list(categories))
+        joined = (self.result_race >= 0) & (self.result_status >= 0)
+        matched = joined & selected[np.where(self.result_status >= 0, self.result_status, 0)]
+        if not matched.any():
+            return []
+        years = self.result_season[self.result_race >= 0]
+        totals_by_year = dict(zip(*np.unique(years, return_counts=True)))
+        rows = []
+        for year, count in zip(*np.unique(self.result_season[matched], return_counts=True)):
+            rows.append((int(year), int(count), int(count) * 100.0 / int(totals_by_year[year])))
+        return rows
+
+    def driver_points(self, forename, surname):
+        ids = np.nonzero((self.driver_forename_folded == _fold(forename))
+                         & (self.driver_surname_folded == _fold(surname)))[0]
+        return self._driver_points_rows(ids)
+
+    def driver_points_ids(self, driver_ids):
+        """Points par saison des pilotes `driver_ids` (driverId déjà résolus)."""
+        rows = _encode(np.asarray(driver_ids, dtype=np.int64), self.tables["drivers"]["driverId"])
+        return self._driver_points_rows(rows[rows >= 0])
+
+    def _driver_points_rows(self, ids):
+        mask = np.isin(self.result_driver, ids) & (self.result_race >= 0)
+        if not mask.any():
+            return []
+        points = self.tables["results"]["points"][mask]
+        years, inverse = np.unique(self.result_season[mask], return_inverse=True)
+        sums = np.bincount(inverse, weights=np.nan_to_num(points), minlength=len(years))
+        counted = np.bincount(inverse, weights=~np.isnan(points), minlength=len(years))
+        return [(int(y), float(s) if c else None) for y, s, c in zip(years, sums, counted)]
+
+    def driver_points_batch(self, driver_ids):
+        """Points par pilote et par saison en un seul parcours : [(driverId, year, total_points), ...]."""
+        driver_column = self.tables["drivers"]["driverId"]
+        rows = _encode(np.asarray(driver_ids, dtype=np.int64), driver_column)
+        mask = np.isin(self.result_driver, rows[rows >= 0]) & (self.result_race >= 0)
+        if not mask.any():
+            return []
+        points = self.tables["results"]["points"][mask]
+        keys = self.result_driver[mask].astype(np.int64) * 10000 + self.result_season[mask]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse, weights=np.nan_to_num(points), minlength=len(groups))
+        counted = np.bincount(inverse, weights=~np.isnan(points), minlength=len(groups))
+        return [(int(driver_column[key // 10000]), int(key % 10000), float(total) if count else None)
+                for key, total, count in zip(groups, sums, counted)]
+
+    def result_year(self, year, rank):
+        races = self.tables["races"]
+        drivers = self.tables["drivers"]
+        circuits = self.tables["circuits"]
+        race = self.result_race
+        circuit = np.where(race >= 0, self.race_circuit[race], -1)
+        mask = ((self.result_season == year) & (self.tables["results"]["position"] == rank)
+                & (self.result_driver >= 0) & (circuit >= 0))
+        idx = np.nonzero(mask)[0]
+        idx = idx[np.argsort(races["date"][race[idx]], kind="stable")]
+        return [(races["date"][race[i]], circuits["country"][circuit[i]], races["name"][race[i]],
+                 drivers["forename"][self.result_driver[i]], drivers["surname"][self.result_driver[i]],
+                 rank)
+                for i in idx]
+
+    def result_pilote_constructeur(self, name):
+        constructors = self.tables["constructors"]
+        drivers = self.tables["drivers"]
+        ids = np.nonzero(self.constructor_name_normalized == normalize(name))[0]
+        mask = np.isin(self.result_constructor, ids) & (self.result_driver >= 0) & (self.result_race >= 0)
+        if not mask.any():
+            return []
+        name_codes = self.driver_name_code[self.result_driver[mask]]
+        groups, first, inverse = np.unique(name_codes, return_index=True, return_inverse=True)
+        years = self.result_season[mask]
+        debut = np.full(len(groups), np.iinfo(np.int32).max, dtype=np.int64)
+        fin = np.zeros(len(groups), dtype=np.int64)
+        np.minimum.at(debut, inverse, years)
+        np.maximum.at(fin, inverse, years)
+        nbr_gp = np.bincount(inverse, weights=~np.isnan(self.tables["results"]["points"][mask]),
+                             minlength=len(groups))
+        ecurie = constructors["name"][self.result_constructor[mask][0]]
+        driver_rows = self.result_driver[mask][first]
+        rows = [(ecurie, drivers["forename"][d], drivers["surname"][d],
+                 int(f + 1 - b), int(b), int(f), int(n))
+                for d, b, f, n in zip(driver_rows, debut, fin, nbr_gp)]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+
+_engine = None
+_lock = threading.Lock()
+
+
+def load(engine):
+    """Charge (ou recharge) les tables en mémoire et active le moteur."""
+    global _engine
+    if np is None:
+        print("Warning: numpy absent, moteur d'analyse en mémoire désactivé.")
+        return None
+    with _lock:
+        _engine = AnalyticsEngine(_load_tables(engine))
+    return _engine
+
+
+def _dataset_version(engine):
+    try:
+        with engine.connect() as connection:
+            row = connection.execute(versioning.VERSION_QUERY).fetchone()
+        return row[0] if row else None
+    except Exception:
+        return None
+
+
+def _load_tables(engine):
+    # Instantané de la version courante s'il existe, sinon lecture de la base puis écriture
+    version = _dataset_version(engine) if snapshot.SNAPSHOT_DIR else None
+    if version is None:
+        return AnalyticsEngine.read_tables(engine)
+    tables = snapshot.open_tables(version)
+    if tables is not None:
+        return tables
+    tables = AnalyticsEngine.read_tables(engine)
+    try:
+        snapshot.write(tables, version)
+    except OSError as e:
+        print(f"Warning: instantané d'analyse non écrit : {e}")
+        return tables
+    # Relu mappé : ce processus partage aussi la copie du cache de pages
+    return snapshot.open_tables(version) or tables
+
+
+def write_snapshot(engine):
+    """Écrit l'instantané de la version courante (fin de chargement, local_db.py)."""
+    version = _dataset_version(engine)
+    if np is None or not snapshot.SNAPSHOT_DIR or version is None:
+        return None
+    return snapshot.write(AnalyticsEngine.read_tables(engine), version)
+
+
+def reload(engine):
+    """Recharge le moteur s'il est actif (nouvelle version du jeu de données)."""
+    if _engine is not None:
+        load(engine)
+
+
+def get_engine():
+    """Renvoie le moteur chargé, ou None si les routes doivent interroger SQL."""
+    return _engine
+
+
+def compare_with_sql(engine, analytics_engine):
+    """Compare chaque agrégat en mémoire avec la requête SQL d'origine.
+
+    Renvoie un dict {nom: bool}. L'ordre des ex-aequo n'étant pas défini en SQL,
+    les lignes sont comparées triées.
+    """
+    checks = {
+        "nbr_win_driver": (queries.NBR_WIN_DRIVER, {}, analytics_engine.nbr_win_driver),
+        "constructor_victory": (queries.CONSTRUCTOR_VICTORY, {}, analytics_engine.constructor_victory),
+        "pole_position_annee": (queries.POLE_POSITION_ANNEE, {}, analytics_engine.pole_position_annee),
+        "nbr_course_circuit": (queries.NBR_COURSE_CIRCUIT, {}, analytics_engine.nbr_course_circuit),
+        "abandon_annee": (queries.ABANDON_ANNEE, {}, analytics_engine.abandon_annee),
+        "abandon_annee_categories": (queries.ABANDON_ANNEE_AGG, {"categories": ["engine", "transmission"]},
+                                     lambda: analytics_engine.abandon_annee(["engine", "transmission"])),
+        "driver_points": (queries.DRIVER_POINTS, {"forename": "Alain", "surname": "Prost"},
+                          lambda: analytics_engine.driver_points("Alain", "Prost")),
+        "driver_points_batch": (queries.driver_points_batch([1, 30, 117]), {},
+                                lambda: analytics_engine.driver_points_batch([1, 30, 117])),
+        "result_year": (queries.RESULT_YEAR, {"year": 2009, "rank": 1},
+                        lambda: analytics_engine.result_year(2009, 1)),
+        "result_pilote_constructeur": (queries.RESULT_PILOTE_CONSTRUCTEUR, {"name": "Ferrari"},
+                                       lambda: analytics_engine.result_pilote_constructeur("Ferrari")),
+    }
+
+    def normalise(rows):
+        return sorted(tuple(round(float(v), 6) if isinstance(v, (int, float)) or type(v).__name__ == "Decimal"
+                            else str(v) for v in row)
+                      for row in rows)
+
+    report = {}
+    with engine.connect() as connection:
+        for name, (query, params, compute) in checks.items():
+            expected = connection.execute(query, params).fetchall()
+            report[name] = normalise(expected) == normalise(compute())
+    return report
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    for name, ok in compare_with_sql(engine, AnalyticsEngine.from_engine(engine)).items():
+        print(f"{name}: {'OK' if ok else 'DIFFERENT'}")
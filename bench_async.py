@@ -0,0 +1,96 @@
+"""Benchmark : débit concurrent avec session synchrone vs session asynchrone.
+
+Reproduit l'ancien schéma (db.execute synchrone dans un handler async def) et
+le nouveau (AsyncSession) sur la même requête, puis mesure le débit et la
+latence d'une route /ping servie pendant la charge : avec la session
+synchrone, la boucle d'événements est bloquée à chaque requête SQL.
+
+Usage :
+    python local_db.py               # une fois : construit f1_local.db
+    F1_BACKEND=local python bench_async.py --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+import queries
+from database import SessionLocal, AsyncSessionLocal
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+# Ancien schéma : appel bloquant dans un handler async
+@app.get("/sync")
+async def sync_route():
+    db = SessionLocal()
+    try:
+        rows = db.execute(queries.NBR_WIN_DRIVER).fetchall()
+    finally:
+        db.close()
+    return {"rows": len(rows)}
+
+
+# Nouveau schéma : session asynchrone
+@app.get("/async")
+async def async_route():
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(queries.NBR_WIN_DRIVER)).fetchall()
+    return {"rows": len(rows)}
+
+
+async def run(client, path, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    ping_latencies = []
+
+    async def one():
+        async with semaphore:
+            response = await client.get(path)
+            response.raise_for_status()
+
+    async def probe():
+        # Latence d'une route triviale pendant la charge
+        while not stop.is_set():
+            start = time.perf_counter()
+            await client.get("/ping")
+            ping_latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return {
+        "route": path,
+        "rps": round(total / elapsed, 1),
+        "ping_samples": len(ping_latencies),
+        "ping_p50_ms": round(statistics.median(ping_latencies), 2) if ping_latencies else None,
+        "ping_max_ms": round(max(ping_latencies), 2) if ping_latencies else None,
+    }
+
+
+async def main(total, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/sync", "/async"):
+            await client.get(path)  # préchauffage du pool
+            print(await run(client, path, total, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
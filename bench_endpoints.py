@@ -0,0 +1,161 @@
+"""Benchmark de toutes les routes de main.py sur la base locale.
+
+Démarre l'application dans le processus (lifespan compris) sur la base SQLite
+de local_db.py, construite à partir des CSV si elle n'existe pas, obtient un
+token puis mesure, pour chaque route et chaque niveau de concurrence, la
+latence p50/p95/p99 et le débit. Les résultats sont écrits en JSON ; avec
+--baseline, les écarts avec un résultat précédent sont affichés (p95 et débit)
+pour repérer les régressions d'une version à l'autre.
+
+Usage :
+    python bench_endpoints.py --concurrency 1,8,32 --requests 200 --output bench_results.json
+    python bench_endpoints.py --baseline bench_results_v1.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+
+import httpx
+
+USERNAME = "bench_endpoints"
+PASSWORD = "bench_password"
+
+# (méthode, chemin, corps JSON) ; /users et /cache/invalidate modifient l'état et sont exclus
+ROUTES = [
+    ("GET", "/protected", None),
+    ("POST", "/driver_points", {"forename": "Alain", "surname": "Prost"}),
+    ("POST", "/driver_points/batch", [{"forename": "Alain", "surname": "Prost"},
+                                      {"forename": "Ayrton", "surname": "Senna"},
+                                      {"forename": "Michael", "surname": "Schumacher"}]),
+    ("GET", "/abandon_annee", None),
+    ("GET", "/pole_position_annee", None),
+    ("GET", "/constructor_victory", None),
+    ("GET", "/nbr_course_circuit", None),
+    ("GET", "/nbr_win_driver", None),
+    ("GET", "/circuit_localisation", None),
+    ("GET", "/detail_pilote", None),
+    ("GET", "/drivers/search?q=sen", None),
+    ("GET", "/detail_constructor", None),
+    ("GET", "/info_gp", None),
+    ("POST", "/result_year", {"year": 2009, "rank": 1}),
+    ("GET", "/tout_constructeur", None),
+    ("POST", "/result_pilote_constructeur", {"constru": "Ferrari"}),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def measure(client, method, path, body, headers, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    rejected = 0  # 503 du contrôle d'admission (admission.py)
+
+    async def one():
+        nonlocal errors, rejected
+        async with semaphore:
+            start = time.perf_counter()
+            if method == "POST" and path == "/token":
+                response = await client.post(path, data=body)
+            else:
+                response = await client.request(method, path, json=body, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code == 503:
+                rejected += 1
+            elif response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return {
+        "route": f"{method} {path}",
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "rejected": rejected,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run(levels, total, login_total):
+    from main import app  # après le choix de la base (F1_BACKEND)
+    import database
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await client.post("/users", json={"username": USERNAME, "password": PASSWORD, "email": "bench_endpoints@example.com"})
+            response = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            routes = [("POST", "/token", {"username": USERNAME, "password": PASSWORD})] + ROUTES
+            for method, path, body in routes:
+                await client.request(method, path, json=body, headers=headers)  # préchauffage
+                for concurrency in levels:
+                    count = login_total if path == "/token" else total
+                    result = await measure(client, method, path, body, headers, count, concurrency)
+                    results.append(result)
+                    print(result)
+    return {
+        "date": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": database.engine.url.render_as_string(hide_password=True),
+        "analytics_memory": os.getenv("F1_ANALYTICS_MEMORY", "0") == "1",
+        "results": results,
+    }
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["route"], r["concurrency"]): r for r in json.load(f)["results"]}
+    for result in report["results"]:
+        previous = baseline.get((result["route"], result["concurrency"]))
+        if previous is None:
+            continue
+        print(f"{result['route']} c={result['concurrency']}: "
+              f"p95 {previous['p95_ms']} -> {result['p95_ms']} ms, "
+              f"rps {previous['rps']} -> {result['rps']} "
+              f"(x{round(result['rps'] / previous['rps'], 2)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-requests", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline")
+    args = parser.parse_args()
+
+    os.environ.setdefault("F1_BACKEND", "local")
+    import local_db
+    if os.environ["F1_BACKEND"] == "local" and not os.path.exists(local_db.LOCAL_DB_PATH):
+        local_db.build_local_database()
+
+    report = asyncio.run(run([int(c) for c in args.concurrency.split(",")], args.requests, args.login_requests))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Résultats écrits dans {args.output}")
+    if args.baseline:
+        compare(report, args.baseline)
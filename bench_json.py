@@ -0,0 +1,66 @@
+"""Micro-benchmark : sérialisation par défaut de FastAPI vs ORJSONResponse.
+
+Construit la charge de /detail_pilote à partir de drivers_ok.csv (pas besoin de
+base) et compare le chemin par défaut (jsonable_encoder + json.dumps) avec
+ORJSONResponse, construction des dicts depuis les tuples comprise. Une seconde
+charge avec des date et Decimal (comme /result_year ou /abandon_annee sous
+SQL Server) vérifie leur prise en charge.
+
+Usage :
+    python bench_json.py --repeat 200
+"""
+import argparse
+import csv
+import datetime
+import timeit
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import ORJSONResponse
+
+
+def detail_pilote_rows():
+    with open("drivers_ok.csv", newline="", encoding="utf-8") as f:
+        return [(row["forename"], row["surname"], row["nationality"], row["url"]) for row in csv.DictReader(f)]
+
+
+def mixed_rows(n):
+    return [(datetime.date(2009, 3, 29), "Australia", "Australian Grand Prix", Decimal("12.5") + i, i) for i in range(n)]
+
+
+def build(rows, keys):
+    return {"data": [dict(zip(keys, row)) for row in rows]}
+
+
+def default_path(rows, keys):
+    return JSONResponse(jsonable_encoder(build(rows, keys))).body
+
+
+def orjson_path(rows, keys):
+    return ORJSONResponse(build(rows, keys)).body
+
+
+def main(repeat):
+    payloads = {
+        "detail_pilote": (detail_pilote_rows(), ("forename", "surname", "nationality", "url")),
+        "date_decimal": (mixed_rows(1000), ("date", "country", "name", "points", "rank")),
+    }
+    for name, (rows, keys) in payloads.items():
+        default = min(timeit.repeat(lambda: default_path(rows, keys), number=1, repeat=repeat))
+        fast = min(timeit.repeat(lambda: orjson_path(rows, keys), number=1, repeat=repeat))
+        print({
+            "payload": name,
+            "rows": len(rows),
+            "default_ms": round(default * 1000, 3),
+            "orjson_ms": round(fast * 1000, 3),
+            "speedup": round(default / fast, 1),
+        })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.repeat)
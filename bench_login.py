@@ -0,0 +1,84 @@
+"""Benchmark : débit de /token face à la latence d'une route de lecture.
+
+Envoie une rafale de connexions concurrentes sur /token pendant qu'une sonde
+appelle /protected en continu, puis affiche le débit des connexions, le nombre
+de 503 (file "auth" du contrôle d'admission pleine) et la latence de la sonde.
+À lancer avec différentes valeurs de F1_HASH_WORKERS / F1_ADMISSION_AUTH_QUEUE ;
+F1_HASH_WORKERS=0 reproduit l'ancien comportement (bcrypt sur la boucle
+d'événements).
+
+Usage :
+    python local_db.py               # une fois : construit f1_local.db
+    F1_BACKEND=local python bench_login.py --logins 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import admission
+import hashing
+from main import app
+
+USERNAME = "bench_login"
+PASSWORD = "bench_password"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def main(total, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    # lifespan : création des tables (users...) et préchauffage comme sous uvicorn
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/users", json={"username": USERNAME, "password": PASSWORD, "email": "bench@example.com"})
+            response = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            semaphore = asyncio.Semaphore(concurrency)
+            stop = asyncio.Event()
+            statuses = []
+            probe_latencies = []
+
+            async def login():
+                async with semaphore:
+                    r = await client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+                    statuses.append(r.status_code)
+
+            async def probe():
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    await client.get("/protected", headers=headers)
+                    probe_latencies.append((time.perf_counter() - start) * 1000)
+                    await asyncio.sleep(0.005)
+
+            probe_task = asyncio.create_task(probe())
+            start = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(total)))
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await probe_task
+
+    print({
+        "hash_workers": hashing.HASH_WORKERS,
+        "auth_limit": admission.limiters["auth"].limit,
+        "auth_queue": admission.limiters["auth"].queue_size,
+        "logins_per_s": round(statuses.count(200) / elapsed, 1),
+        "rejected_503": statuses.count(503),
+        "probe_samples": len(probe_latencies),
+        "probe_p50_ms": round(statistics.median(probe_latencies), 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 99), 2),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
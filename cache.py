@@ -0,0 +1,119 @@
+"""Cache de réponses pour les routes de référence de main.py.
+
+Les entrées contiennent le JSON déjà sérialisé et ses variantes compressées
+({encodage: bytes}, compression.py) : un hit évite à la fois la requête SQL, la
+construction des dicts et la compression. La mémoire est bornée (nombre
+d'entrées et total d'octets de toutes les variantes) avec éviction LRU, chaque
+entrée a son propre TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_MAX_ENTRIES = int(os.getenv("F1_CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_BYTES = int(os.getenv("F1_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("F1_USER_CACHE_MAX_ENTRIES", "1024"))
+USER_CACHE_TTL = float(os.getenv("F1_USER_CACHE_TTL", "60"))
+
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clé -> (expiration, {encodage: bytes})
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, body = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body, ttl):
+        size = _size(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, body)
+            self._size += size
+            # Éviction des entrées les moins récemment utilisées
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, prefix=None):
+        """Supprime toutes les entrées, ou seulement celles dont la clé commence par `prefix`."""
+        with self._lock:
+            keys = [k for k in self._entries if prefix is None or k.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size,
+                    "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self._size -= _size(body)
+
+
+def _size(variants):
+    return sum(len(body) for body in variants.values())
+
+
+class TTLCache:
+    """Cache LRU d'objets avec un TTL unique, borné en nombre d'entrées."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Supprime une entrée, ou toutes si `key` est None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+response_cache = ResponseCache()
+# Utilisateurs authentifiés, par username (évite une requête par appel protégé)
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
@@ -0,0 +1,75 @@
+"""Corps de réponse pré-compressés et négociation Accept-Encoding.
+
+Les réponses du cache (cache.py) sont compressées une seule fois, au moment où
+elles sont mises en cache : chaque entrée garde le JSON brut et ses variantes
+gzip (et brotli si le paquet `brotli` est installé). Un hit choisit la variante
+acceptée par le client sans aucun travail de compression. Les corps plus petits
+que F1_COMPRESS_MIN_BYTES restent non compressés : l'en-tête gzip coûterait plus
+qu'il ne ferait gagner.
+"""
+import gzip
+import os
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seul
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("F1_COMPRESS_MIN_BYTES", "1024"))
+# Compression faite une fois par entrée de cache, mais à chaque miss (chaque page
+# de /detail_pilote est une entrée) : brotli 11 coûte ~240 ms sur 100 Ko, contre
+# ~4 ms à 5 pour un taux proche
+GZIP_LEVEL = int(os.getenv("F1_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("F1_BROTLI_QUALITY", "5"))
+
+# Par ordre de préférence à qualité égale
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body):
+    """Variantes {encodage: bytes} du corps, "identity" comprise."""
+    variants = {"identity": body}
+    if len(body) < COMPRESS_MIN_BYTES:
+        return variants
+    # mtime=0 : même corps, mêmes octets (les ETags restent stables)
+    variants["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def negotiate(accept_encoding):
+    """Encodage préféré parmi ENCODINGS d'après l'en-tête Accept-Encoding, sinon "identity"."""
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = "identity", 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def response(variants, accept_encoding, media_type="application/json"):
+    """Réponse avec la variante négociée (identity si le corps n'a pas été compressé)."""
+    encoding = negotiate(accept_encoding)
+    if encoding not in variants:
+        encoding = "identity"
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=variants[encoding], media_type=media_type, headers=headers)
@@ -0,0 +1,36 @@
+"""Correspondance nom de constructeur -> constructorId(s).
+
+/result_pilote_constructeur reçoit un nom libre : il est résolu une fois ici
+(nom normalisé comme dans driver_index.py, accents et casse ignorés) puis la
+route lit agg_driver_constructor_tenure par constructorId. La table est
+construite à la première utilisation et oubliée à chaque nouveau jeu de
+données (versioning.on_version_change).
+"""
+from sqlalchemy import text
+
+from driver_index import normalize
+
+CONSTRUCTOR_NAMES = text("SELECT constructorId, name FROM constructors")
+
+_by_name = None  # nom normalisé -> [constructorId, ...]
+
+
+def build(rows):
+    by_name = {}
+    for constructor_id, name in rows:
+        by_name.setdefault(normalize(name), []).append(constructor_id)
+    return by_name
+
+
+async def resolve(db, name):
+    """constructorId(s) portant ce nom (liste vide si inconnu)."""
+    global _by_name
+    if _by_name is None:
+        result = await db.execute(CONSTRUCTOR_NAMES)
+        _by_name = build(result.fetchall())
+    return _by_name.get(normalize(name), [])
+
+
+def invalidate():
+    global _by_name
+    _by_name = None
@@ -1,36 +1,175 @@
+import asyncio
+import os
+import threading
+import time
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+# Base utilisée : "mssql" (serveur SQL Server) ou "local" (fichier SQLite construit
+# par local_db.py à partir des CSV). F1_DATABASE_URL / F1_ASYNC_DATABASE_URL
+# restent prioritaires.
+BACKEND = os.getenv("F1_BACKEND", "mssql")
+LOCAL_DB_PATH = os.getenv("F1_LOCAL_DB_PATH", "f1_local.db")
+
+if BACKEND == "local":
+    _DEFAULT_URL = f"sqlite:///{LOCAL_DB_PATH}"
+    _DEFAULT_ASYNC_URL = f"sqlite+aiosqlite:///{LOCAL_DB_PATH}"
+else:
+    _DEFAULT_URL = "mssql+pyodbc://DESKTOP-8EFA22F\frede@DESKTOP-8EFA22F\SQLEXPRESS/Course_oki?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+    # "mssql+pyodbc://technofuturtic\f.renaux@GOS-VDI307\TFTIC/Course_oki?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+    _DEFAULT_ASYNC_URL = "mssql+aioodbc://DESKTOP-8EFA22F\frede@DESKTOP-8EFA22F\SQLEXPRESS/Course_oki?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+
+# URL synchrone (scripts, création des tables, chargement en mémoire)
+DATABASE_URL = os.getenv("F1_DATABASE_URL", _DEFAULT_URL)
+# URL asynchrone utilisée par les routes (aioodbc pour SQL Server, aiosqlite en local)
+ASYNC_DATABASE_URL = os.getenv("F1_ASYNC_DATABASE_URL", _DEFAULT_ASYNC_URL)
+# Délai maximal (secondes) de la sonde de santé, et durée de réutilisation de son résultat
+HEALTH_TIMEOUT = float(os.getenv("F1_HEALTH_TIMEOUT", "5"))
+HEALTH_CACHE_SECONDS = float(os.getenv("F1_HEALTH_CACHE_SECONDS", "10"))
+
+# Réglages du pool de connexions : F1_POOL_SIZE, F1_POOL_MAX_OVERFLOW, F1_POOL_RECYCLE,
+# F1_POOL_PRE_PING, F1_POOL_TIMEOUT et F1_POOL_MIN (connexions ouvertes au démarrage).
+# Avec plusieurs workers, chaque processus a son propre pool : (size + max_overflow)
+# x nombre de workers doit rester sous la limite de connexions du serveur.
+class PoolSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="F1_POOL_")
+
+    size: int = 5
+    max_overflow: int = 10
+    recycle: int = 1800
+    pre_ping: bool = True
+    timeout: float = 30
+    min: int = 2
+
+pool_settings = PoolSettings()
+
+class PoolMetrics:
+    """Attente pour obtenir une connexion du pool (checkout)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+# Les métriques sont portées par la classe : elles survivent à pool.recreate()
+# (dispose de l'engine), qui construit une nouvelle instance.
+class TimedQueuePool(QueuePool):
+    metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record(time.perf_counter() - start, timed_out)
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+def _pool_options():
+    return {
+        "pool_size": pool_settings.size,
+        "max_overflow": pool_settings.max_overflow,
+        "pool_recycle": pool_settings.recycle,
+        "pool_pre_ping": pool_settings.pre_ping,
+        "pool_timeout": pool_settings.timeout,
+    }
+
 def get_sqlalchemy_engine():
-    return create_engine(
-        "mssql+pyodbc://DESKTOP-8EFA22F\frede@DESKTOP-8EFA22F\SQLEXPRESS/Course_oki?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
-        # "mssql+pyodbc://technofuturtic\f.renaux@GOS-VDI307\TFTIC/Course_oki?driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
-    )
+    return _create(create_engine, DATABASE_URL, poolclass=TimedQueuePool, **_pool_options())
+
+def get_async_engine():
+    return _create(create_async_engine, ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **_pool_options())
+
+# Pilote absent (aioodbc pour SQL Server, aiosqlite en local, pyodbc) : message
+# indiquant quoi installer plutôt qu'un ModuleNotFoundError à l'import de main.py
+def _create(factory, url, **options):
+    try:
+        return factory(url, **options)
+    except ModuleNotFoundError as e:
+        raise RuntimeError(f"Database driver '{e.name}' is missing for {url.split('://')[0]}: "
+                           f"pip install {e.name} (or set F1_BACKEND=local with aiosqlite)") from e
 
 engine = get_sqlalchemy_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = get_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-def test_connection():
+# Sonde de santé : remplace le test de connexion fait à l'import. Les moteurs
+# ci-dessus n'ouvrent aucune connexion tant qu'ils ne servent pas.
+_health = {"connected": None, "error": None, "checked_at": None}
+
+async def _select_one():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+async def check_health(force=False):
+    """SELECT 1 sur la base asynchrone, résultat réutilisé pendant HEALTH_CACHE_SECONDS."""
+    checked_at = _health["checked_at"]
+    if not force and checked_at is not None and time.monotonic() - checked_at < HEALTH_CACHE_SECONDS:
+        return _health
     try:
-        with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1"))
-            result.fetchone()
-        print("Database connection successful!")
-        return True
+        await asyncio.wait_for(_select_one(), HEALTH_TIMEOUT)
+        _health.update(connected=True, error=None)
     except Exception as e:
-        print(f"Database connection failed: {str(e)}")
-        return False
+        _health.update(connected=False, error=str(e) or type(e).__name__)
+        print(f"Database connection failed: {_health['error']}")
+    _health["checked_at"] = time.monotonic()
+    return _health
 
-# Fonction pour obtenir une session de base de données
-def get_db():
-    db = SessionLocal()
+async def warm_up_pool(count=None):
+    """Ouvre `count` connexions (F1_POOL_MIN par défaut) puis les rend au pool."""
+    count = min(pool_settings.min if count is None else count, pool_settings.size)
+    connections = []
     try:
-        yield db
+        for _ in range(count):
+            connections.append(await async_engine.connect())
     finally:
-        db.close()
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+def _pool_stats(pool):
+    metrics = type(pool).metrics
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / (pool.size() + pool_settings.max_overflow), 3),
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "wait_avg_ms": round(metrics.wait_total / metrics.checkouts * 1000, 3) if metrics.checkouts else 0.0,
+        "wait_max_ms": round(metrics.wait_max * 1000, 3),
+    }
 
-# Test the connection when this module is imported
-connection_status = test_connection()
\ No newline at end of file
+def pool_stats():
+    """État des pools synchrone et asynchrone (saturation = connexions prises / capacité)."""
+    return {"sync": _pool_stats(engine.pool), "async": _pool_stats(async_engine.pool)}
+
+# Fonction pour obtenir une session de base de données (asynchrone, ne bloque pas la boucle d'événements)
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,100 @@
+"""Index des noms de pilotes : autocomplétion et résolution nom -> driverId.
+
+Les noms sont normalisés (accents retirés, casse ignorée), si bien que
+"raikkonen" trouve "Räikkönen". Un trie de préfixes sur "prénom nom", "nom
+prénom" et chaque mot du nom sert /drivers/search ; resolve() renvoie les
+driverId d'un prénom + nom, avec une correspondance approchée (difflib) en
+dernier recours. L'index est construit à la première utilisation et oublié à
+chaque nouveau jeu de données (versioning.on_version_change).
+"""
+import difflib
+import unicodedata
+
+from sqlalchemy import text
+
+DRIVER_NAMES = text("SELECT driverId, forename, surname FROM drivers")
+# Score minimal (difflib) pour accepter un nom approché
+FUZZY_CUTOFF = 0.85
+
+
+def normalize(value):
+    decomposed = unicodedata.normalize("NFKD", str(value))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().replace("-", " ").split())
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class DriverIndex:
+    def __init__(self, rows):
+        self.drivers = {}   # driverId -> (forename, surname)
+        self.normalized = {}  # driverId -> (forename, surname) normalisés
+        self.by_name = {}   # "prénom nom" normalisé -> [driverId, ...]
+        self.root = _Node()
+        for driver_id, forename, surname in rows:
+            self.drivers[driver_id] = (forename, surname)
+            self.normalized[driver_id] = (normalize(forename), normalize(surname))
+            full = " ".join(self.normalized[driver_id])
+            self.by_name.setdefault(full, []).append(driver_id)
+            words = full.split()
+            keys = {" ".join(words[i:]) for i in range(len(words))}
+            keys.add(" ".join(reversed(self.normalized[driver_id])))
+            for key in keys:
+                self._insert(key, driver_id)
+
+    def _insert(self, key, driver_id):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            node.ids.add(driver_id)
+
+    def search(self, query, limit=10):
+        """Pilotes dont le nom (ou un de ses mots) commence par `query`."""
+        query = normalize(query)
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        # Prénom ou nom commençant par la saisie d'abord, puis ordre alphabétique
+        def rank(driver_id):
+            forename, surname = self.normalized[driver_id]
+            starts = forename.startswith(query) or surname.startswith(query)
+            return (not starts, surname, forename, driver_id)
+
+        return [{"driverId": driver_id, "forename": self.drivers[driver_id][0],
+                 "surname": self.drivers[driver_id][1]}
+                for driver_id in sorted(node.ids, key=rank)[:limit]]
+
+    def resolve(self, forename, surname):
+        """driverId(s) du pilote : nom exact normalisé, sinon le nom le plus proche."""
+        full = f"{normalize(forename)} {normalize(surname)}"
+        ids = self.by_name.get(full)
+        if ids:
+            return ids
+        close = difflib.get_close_matches(full, self.by_name.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        return self.by_name[close[0]] if close else []
+
+
+_index = None
+
+
+async def get_index(db):
+    """Index courant, construit avec la session `db` s'il n'existe pas encore."""
+    global _index
+    if _index is None:
+        result = await db.execute(DRIVER_NAMES)
+        _index = DriverIndex(result.fetchall())
+    return _index
+
+
+def invalidate():
+    global _index
+    _index = None
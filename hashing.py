@@ -0,0 +1,36 @@
+"""Exécution de bcrypt hors de la boucle d'événements.
+
+Un hash ou une vérification bcrypt coûte 100 à 300 ms de CPU. Les appels sont
+envoyés à un pool de threads dédié (bcrypt relâche le GIL) de HASH_WORKERS
+threads. Le délestage (503 + Retry-After) est fait en amont par la classe
+"auth" du contrôle d'admission (admission.py), dont la limite par défaut est
+tirée de HASH_WORKERS : ce pool ne reçoit jamais plus de travail qu'elle n'en
+laisse passer.
+
+F1_HASH_WORKERS=0 garde l'ancien comportement (bcrypt sur la boucle), utile
+pour comparer avec bench_login.py.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_WORKERS = int(os.getenv("F1_HASH_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt") if HASH_WORKERS > 0 else None
+_pending = 0
+
+
+def pending():
+    return _pending
+
+
+async def run(fn, *args):
+    """Exécute fn(*args) dans le pool bcrypt."""
+    global _pending
+    if _executor is None:
+        return fn(*args)
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
@@ -229,11 +229,11 @@ def load_fact_race_results(engine):
         r.constructorId,
         q.position as qualifying_position,
         r.grid as grid_position,
-        CASE WHEN r.position = '\\N' THEN NULL ELSE CAST(r.position AS INT) END as finish_position,
+        r.position as finish_position,
         r.points,
         r.laps,
         r.fastestLapTime,
-        CASE WHEN r.fastestLapSpeed = '\\N' THEN NULL ELSE CAST(r.fastestLapSpeed AS FLOAT) END,
+        r.fastestLapSpeed,
         r.statusId,
         COUNT(p.stop) as pit_stops,
         SUM(CAST(p.milliseconds AS FLOAT)) / 1000 as total_pit_stop_duration
@@ -231,17 +231,11 @@ SELECT
     r.constructorId,
     q.position AS qualifying_position,
     r.grid AS grid_position,
-    CASE 
-        WHEN r.position = '\\N' THEN NULL 
-        ELSE TRY_CAST(r.position AS INT) 
-    END AS finish_position,
+    r.position AS finish_position,
     r.points,
     r.laps,
     r.fastestLapTime,
-    CASE 
-        WHEN r.fastestLapSpeed = '\\N' THEN NULL 
-        ELSE TRY_CAST(r.fastestLapSpeed AS FLOAT) 
-    END AS fastest_lap_speed,
+    r.fastestLapSpeed AS fastest_lap_speed,
     r.statusId,
     COUNT(p.stop) AS pit_stops,
     SUM(TRY_CAST(p.milliseconds AS FLOAT)) / 1000 AS total_pit_stop_duration
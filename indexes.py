@@ -0,0 +1,158 @@
+"""Index secondaires du schéma créé par script2.py, et conseiller d'index.
+
+create_tables ne déclare que les clés primaires. INDEXES couvre les jointures
+et filtres de toutes les requêtes de main.py (results.driverId/raceId/
+constructorId, qualifying.driverId, races.year, drivers(forename, surname),
+constructors.name...). Les colonnes INCLUDE rendent l'index couvrant sous SQL
+Server ; les autres dialectes les ajoutent à la clé.
+
+Usage :
+    python indexes.py migrate   # crée les index manquants
+    python indexes.py advise    # plan de chaque requête : scans / seeks
+"""
+import sys
+import xml.etree.ElementTree as ET
+
+from sqlalchemy import Column, Index, MetaData, Table
+
+import queries
+
+# (nom, table, colonnes de clé, colonnes incluses)
+INDEXES = [
+    ("ix_results_driverId", "results", ["driverId"], ["raceId", "constructorId", "position", "points"]),
+    ("ix_results_raceId", "results", ["raceId"], ["driverId", "constructorId", "position", "points", "statusId"]),
+    ("ix_results_constructorId", "results", ["constructorId"], ["driverId", "raceId", "points"]),
+    ("ix_results_position", "results", ["position"], ["driverId", "constructorId", "raceId"]),
+    ("ix_results_statusId", "results", ["statusId"], ["raceId"]),
+    ("ix_qualifying_driverId", "qualifying", ["driverId"], ["position"]),
+    ("ix_qualifying_position", "qualifying", ["position"], ["driverId"]),
+    ("ix_races_year", "races", ["year"], ["raceId", "circuitId", "name", "date"]),
+    ("ix_races_circuitId", "races", ["circuitId"], []),
+    ("ix_races_round", "races", ["round"], ["year", "url"]),
+    ("ix_drivers_name", "drivers", ["forename", "surname"], []),
+    ("ix_constructors_name", "constructors", ["name"], []),
+]
+
+# Requête exécutée par chaque route, avec des paramètres représentatifs
+ROUTE_QUERIES = {
+    "/driver_points": (queries.driver_points_by_ids([117]), {}),
+    "/driver_points/batch": (queries.driver_points_batch([117, 102]), {}),
+    "/abandon_annee": (queries.ABANDON_ANNEE_AGG, {"categories": ["brakes", "engine"]}),
+    "/pole_position_annee": (queries.POLE_POSITION_ANNEE_AGG, {}),
+    "/constructor_victory": (queries.CONSTRUCTOR_VICTORY_AGG, {}),
+    "/nbr_course_circuit": (queries.NBR_COURSE_CIRCUIT_AGG, {}),
+    "/nbr_win_driver": (queries.nbr_win_driver_page(["forename", "surname", "victories"]), {}),
+    "/circuit_localisation": (queries.CIRCUIT_LOCALISATION, {}),
+    "/detail_pilote": (queries.detail_pilote_page(["forename", "surname", "nationality", "url"], [100], 50), {}),
+    "/detail_constructor": (queries.DETAIL_CONSTRUCTOR, {}),
+    "/info_gp": (queries.INFO_GP, {}),
+    "/result_year": (queries.RESULT_YEAR, {"year": 2009, "rank": 1}),
+    "/tout_constructeur": (queries.TOUT_CONSTRUCTEUR, {}),
+    "/result_pilote_constructeur": (queries.result_pilote_constructeur_page(
+        [6], ["ecurie", "forename", "surname", "annee", "debut", "fin", "nbr_gp"]), {}),
+}
+
+SHOWPLAN_NS = {"s": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+
+
+def _index_objects(dialect_name):
+    metadata = MetaData()
+    tables = {}
+    objects = []
+    for name, table, keys, include in INDEXES:
+        columns = keys + include
+        if table not in tables:
+            tables[table] = Table(table, metadata)
+        for column in columns:
+            if column not in tables[table].c:
+                tables[table].append_column(Column(column))
+        t = tables[table]
+        if dialect_name == "mssql":
+            objects.append(Index(name, *[t.c[c] for c in keys], mssql_include=include))
+        else:
+            objects.append(Index(name, *[t.c[c] for c in columns]))
+    return objects
+
+
+def create_indexes(engine):
+    """Crée les index absents (idempotent)."""
+    for index in _index_objects(engine.dialect.name):
+        index.create(bind=engine, checkfirst=True)
+    print("Index secondaires créés.")
+
+
+def _literal_sql(connection, query, params):
+    if params:
+        query = query.bindparams(**params)
+    return str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain(connection, query, params):
+    """Opérations d'accès du plan estimé : liste de (type, objet), type = 'seek' ou 'scan'."""
+    return explain_sql(connection, _literal_sql(connection, query, params))
+
+
+def explain_sql(connection, sql, parameters=()):
+    """Même chose pour une requête déjà compilée (paramètres au format du pilote).
+
+    Renvoie (opérations, plan brut) ; le plan brut est le XML de SHOWPLAN_XML sous
+    SQL Server, les lignes d'EXPLAIN QUERY PLAN ailleurs.
+    """
+    if connection.dialect.name == "mssql":
+        connection.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            plan_xml = connection.exec_driver_sql(sql, parameters).fetchone()[0]
+        finally:
+            connection.exec_driver_sql("SET SHOWPLAN_XML OFF")
+        return _parse_showplan(plan_xml), plan_xml
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    details = [row[-1] for row in rows]
+    return _parse_sqlite_plan(details), "\n".join(details)
+
+
+def _parse_showplan(plan_xml):
+    operations = []
+    for relop in ET.fromstring(plan_xml).iter(f"{{{SHOWPLAN_NS['s']}}}RelOp"):
+        physical = relop.get("PhysicalOp", "")
+        kind = "seek" if "Seek" in physical else "scan" if "Scan" in physical else None
+        if kind is None:
+            continue
+        obj = relop.find("./*/s:Object", SHOWPLAN_NS)
+        target = f"{obj.get('Table', '')}.{obj.get('Index', '')}".strip(".") if obj is not None else ""
+        operations.append((kind, f"{physical} {target}".strip()))
+    return operations
+
+
+def _parse_sqlite_plan(details):
+    operations = []
+    for detail in details:
+        if detail.startswith("SEARCH"):
+            operations.append(("seek", detail))
+        elif detail.startswith("SCAN"):
+            operations.append(("scan", detail))
+    return operations
+
+
+def advise(engine):
+    """Plan de chaque requête de ROUTE_QUERIES : {route: [(type, objet), ...]}."""
+    report = {}
+    with engine.connect() as connection:
+        for route, (query, params) in ROUTE_QUERIES.items():
+            operations, _ = explain(connection, query, params)
+            report[route] = operations
+    return report
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "advise"
+    if command == "migrate":
+        create_indexes(engine)
+    else:
+        for route, operations in advise(engine).items():
+            scans = sum(1 for kind, _ in operations if kind == "scan")
+            seeks = sum(1 for kind, _ in operations if kind == "seek")
+            print(f"{route}: {seeks} seek(s), {scans} scan(s)")
+            for kind, target in operations:
+                print(f"    {kind:5} {target}")
@@ -0,0 +1,94 @@
+"""Base locale SQLite construite à partir des *_ok.csv.
+
+Même chargement que script2.py (colonnes typées, '\\N' -> NULL), avec les clés
+primaires en index uniques, les index de indexes.py, les tables d'agrégats et
+la version du jeu de données. L'API tourne dessus avec F1_BACKEND=local : base
+de référence reproductible pour les tests de charge, hors ligne, ou réplique en
+lecture bon marché. La table users est créée au démarrage de l'API.
+
+Usage :
+    python local_db.py               # construit f1_local.db (F1_LOCAL_DB_PATH)
+    F1_BACKEND=local uvicorn main:app
+"""
+import os
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from aggregates import refresh_aggregates
+from analytics import write_snapshot
+from indexes import create_indexes
+from script2 import FILES_AND_TABLES, preprocess_dataframe
+from versioning import hash_files
+
+LOCAL_DB_PATH = os.getenv("F1_LOCAL_DB_PATH", "f1_local.db")
+
+# Clé primaire de chaque table (celles de create_tables dans script2.py)
+PRIMARY_KEYS = {
+    "circuits": "circuitId",
+    "races": "raceId",
+    "drivers": "driverId",
+    "constructors": "constructorId",
+    "constructor_results": "constructorResultsId",
+    "constructor_standings": "constructorStandingsId",
+    "driver_standings": "driverStandingsId",
+    "results": "resultId",
+    "pit_stops": "raceId, driverId, stop",
+    "qualifying": "qualifyId",
+    "seasons": "year",
+    "status": "statusId",
+}
+
+
+def load_csv(file_path, table_name, engine):
+    df = pd.read_csv(file_path, index_col=0)
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop('Unnamed: 0', axis=1)
+    df = preprocess_dataframe(df)
+    # SQLite n'a pas de type DATE : on garde 'AAAA-MM-JJ' comme SQL Server
+    for col in ('date', 'dob'):
+        if col in df.columns:
+            df[col] = df[col].dt.date
+    df.to_sql(table_name, con=engine, if_exists='replace', index=False, chunksize=10000)
+    print(f"Les données du fichier {file_path} ont été insérées dans la table {table_name}.")
+
+
+def build_local_database(path=LOCAL_DB_PATH):
+    """(Re)construit la base SQLite complète à `path`."""
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        # WAL : les lectures de l'API ne sont pas bloquées par les écritures (users)
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+    loaded_files = []
+    for file_path, table_name in FILES_AND_TABLES.items():
+        if os.path.exists(file_path):
+            load_csv(file_path, table_name, engine)
+            loaded_files.append(file_path)
+        else:
+            print(f"Le fichier {file_path} n'existe pas.")
+
+    tables = set(inspect(engine).get_table_names())
+    with engine.begin() as connection:
+        for table, key in PRIMARY_KEYS.items():
+            if table in tables:
+                connection.exec_driver_sql(f"CREATE UNIQUE INDEX pk_{table} ON {table} ({key})")
+        connection.exec_driver_sql(
+            "CREATE TABLE dataset_version (id INTEGER PRIMARY KEY, version VARCHAR(64), loaded_at DATETIME)")
+        connection.execute(text("INSERT INTO dataset_version (id, version, loaded_at) "
+                                "VALUES (1, :version, CURRENT_TIMESTAMP)"),
+                           {"version": hash_files(loaded_files)})
+    create_indexes(engine)
+    refresh_aggregates(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    # Colonnes du moteur d'analyse prêtes à être mappées par les workers
+    write_snapshot(engine)
+    engine.dispose()
+    print(f"Base locale prête : {path}")
+
+
+if __name__ == "__main__":
+    build_local_database()
@@ -1,78 +1,264 @@
-from fastapi import FastAPI, Depends, HTTPException, status #status ajouté
-from sqlalchemy.orm import Session,sessionmaker #sessionmaker ajouté
-from sqlalchemy import text
-from database import get_db, Base, engine, connection_status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status #status ajouté
+from sqlalchemy import text, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, Base, engine, async_engine, check_health, warm_up_pool, pool_stats
 from models import User
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from responses import ORJSONResponse, dumps
 from schemas import UserCreate
 #importer le reste (copié-collé)
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import List
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import os
+import time
 import jwt
 from datetime import UTC, datetime, timedelta
 from passlib.context import CryptContext
-from schema2 import DriverRequest,PosRequest,PosConstru
+from schema2 import DriverRequest,DriverPointsRequest,PosRequest,PosConstru
+import queries
+import aggregates
+import analytics
+from cache import response_cache, user_cache
+import versioning
+import hashing
+import pagination
+import streaming
+import metrics
+import slow_queries
+import constructor_index
+import driver_index
+import compression
+import admission
 # Configuration de la sécurité (copié-collé)
 SECRET_KEY = "votre_clé_secrète1"  # Remplacez par une clé secrète robuste
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Si activé, un token émis depuis moins de TOKEN_FRESH_SECONDS suffit à identifier
+# l'utilisateur (aucune lecture de la table users)
+AUTH_CLAIMS_ONLY = os.getenv("F1_AUTH_CLAIMS_ONLY", "0") == "1"
+TOKEN_FRESH_SECONDS = int(os.getenv("F1_TOKEN_FRESH_SECONDS", "300"))
+# Nombre maximal de pilotes par appel à /driver_points/batch
+DRIVER_POINTS_BATCH_MAX = 50
+# Nombre maximal de suggestions de /drivers/search
+DRIVER_SEARCH_MAX = 50
+# Champs disponibles pour la projection (paramètre fields=) des routes de liste
+DETAIL_PILOTE_FIELDS = ["forename", "surname", "nationality", "url"]
+NBR_WIN_DRIVER_FIELDS = ["forename", "surname", "victories"]
+RESULT_PILOTE_CONSTRUCTEUR_FIELDS = ["ecurie", "forname", "surname", "annee", "debut", "fin", "nbr_gp"]
+# Délai maximal (secondes) de l'initialisation de la base au démarrage
+STARTUP_TIMEOUT = float(os.getenv("F1_STARTUP_TIMEOUT", "10"))
+# Jeton d'administration (en-tête X-Admin-Token) des routes d'exploitation comme
+# /cache/invalidate ; non défini : ces routes sont refusées à tous
+ADMIN_TOKEN = os.getenv("F1_ADMIN_TOKEN", "")
+# Durée de vie (secondes) des réponses mises en cache pour les routes de référence
+CACHE_TTL = {
+    "/detail_pilote": 3600,
+    "/detail_constructor": 3600,
+    "/circuit_localisation": 3600,
+    "/info_gp": 3600,
+    "/tout_constructeur": 3600,
+}
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-app = FastAPI()
 
+# Créer les tables dans la base de données (si nécessaire)
+def init_database():
+    Base.metadata.create_all(bind=engine)
+    # Tables d'agrégats : construites ici si aucun chargement ne l'a encore fait
+    try:
+        aggregates.create_aggregate_tables(engine)
+        if aggregates.aggregates_empty(engine):
+            aggregates.refresh_aggregates(engine)
+    except Exception as e:
+        print(f"Warning: aggregate tables not refreshed: {str(e)}")
+    # Chargement optionnel des tables en mémoire (F1_ANALYTICS_MEMORY=1)
+    if analytics.ANALYTICS_ENABLED:
+        analytics.load(engine)
+
+# Initialisation au démarrage du serveur et non plus à l'import : elle tourne dans
+# un thread, et au-delà de STARTUP_TIMEOUT le serveur démarre sans l'attendre
+# (les routes lisent alors la base, le moteur en mémoire arrive quand il est prêt).
+@asynccontextmanager
+async def lifespan(app):
+    # Pool fermé aussi si le démarrage ou l'arrêt est interrompu : les threads de
+    # connexion aiosqlite garderaient sinon le processus en vie
+    try:
+        try:
+            await asyncio.wait_for(asyncio.to_thread(init_database), STARTUP_TIMEOUT)
+            # Pool pré-rempli : les premières requêtes n'attendent pas l'ouverture des connexions
+            await asyncio.wait_for(warm_up_pool(), STARTUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Warning: database initialisation still running after {STARTUP_TIMEOUT}s, starting anyway.")
+        except Exception as e:
+            print(f"Warning: Tables not created due to connection failure: {str(e)}")
+        yield
+    finally:
+        await async_engine.dispose()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Temps SQL par requête pour /metrics
+metrics.install_db_hooks(async_engine.sync_engine)
+metrics.install_db_hooks(engine)
+# Requêtes lentes des routes journalisées avec leur plan (slow_queries.py)
+slow_queries.install(async_engine.sync_engine, plan_engine=engine)
+# Un nouveau chargement script2.py rend les réponses en cache obsolètes
+versioning.on_version_change(response_cache.invalidate)
+versioning.on_version_change(lambda: analytics.reload(engine))
+versioning.on_version_change(driver_index.invalidate)
+versioning.on_version_change(constructor_index.invalidate)
+
+# Ajoute l'ETag aux réponses GET et répond 304 si le client a déjà le même contenu
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if request.method != "GET" or response.status_code != 200:
+        return response
+    etag = getattr(request.state, "etag", None)
+    if etag is not None:
+        response.headers["ETag"] = etag
+        return response
+    # Routes hors jeu de données : ETag calculé sur le contenu JSON
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = versioning.body_etag(body)
+    if versioning.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    headers = dict(response.headers)
+    headers["ETag"] = etag
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+# Files d'attente bornées par classe de routes, 503 + Retry-After si pleines
+# (ajouté après etag_middleware et avant metrics_middleware : l'attente et les
+# rejets sont mesurés)
+app.add_middleware(admission.AdmissionMiddleware)
+
+# Mesures par route (déclaré après etag_middleware : il l'englobe)
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    phases = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None:
+        label = route.path
+    elif "f1_admission_rejected" in request.scope:
+        # Rejeté avant le routage : étiqueté par sa classe, pas mêlé aux 404
+        label = f"rejected:{request.scope['f1_admission_rejected']}"
+    else:
+        label = "unmatched"
+    metrics.registry.record_request(request.method, label, response.status_code,
+                                    time.perf_counter() - start, phases)
+    return response
+
+# CORS ajouté en dernier : middleware le plus externe, ses en-têtes sont aussi
+# posés sur les 503 du contrôle d'admission
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Autorise toutes les origines. 
     allow_credentials=True,
     allow_methods=["*"],  # Autorise toutes les méthodes (GET, POST, PUT, etc.).
     allow_headers=["*"],  # Autorise tous les headers.
+    expose_headers=["Retry-After"],  # Lisible par un navigateur sur les 503
 )
-# Créer les tables dans la base de données (si nécessaire)
-if connection_status:
-    Base.metadata.create_all(bind=engine)
-else:
-    print("Warning: Tables not created due to connection failure.")
 
 @app.get("/") #cette foncion fonctionne
 async def read_root():
-    return {"message": "Welcome to the API!", "database_connected": connection_status}
+    health = await check_health()
+    return {"message": "Welcome to the API!", "database_connected": health["connected"]}
+
+# Sonde de santé (résultat mis en cache quelques secondes) : 503 si la base ne répond pas
+@app.get("/health")
+async def health():
+    health = await check_health()
+    status_code = 200 if health["connected"] else 503
+    return ORJSONResponse({"database_connected": health["connected"], "error": health["error"]},
+                          status_code=status_code)
+
+# Métriques du pool de connexions (attente au checkout, saturation)
+@app.get("/pool_stats")
+async def get_pool_stats():
+    return pool_stats()
+
+# Exposition Prometheus : histogrammes par route et par phase, pool, caches
+@app.get("/metrics")
+async def get_metrics():
+    pools = pool_stats()
+    gauges = [(f"f1_db_pool_{name}", f"Connection pool {name.replace('_', ' ')}.",
+               {f'pool="{pool}"': stats[name] for pool, stats in pools.items()})
+              for name in pools["async"]]
+    for name, value in response_cache.stats().items():
+        gauges.append((f"f1_response_cache_{name}", f"Response cache {name}.", {"": value}))
+    gauges.append(("f1_hashing_pending", "bcrypt jobs queued or running.", {"": hashing.pending()}))
+    classes = admission.stats()
+    for name in ("limit", "queue_size", "active", "waiting"):
+        gauges.append((f"f1_admission_{name}", f"Admission control {name.replace('_', ' ')} per route class.",
+                       {f'class="{c}"': stats[name] for c, stats in classes.items()}))
+    counters = [("f1_admission_rejected_total", "Requests rejected with 503 per route class.",
+                 {f'class="{c}"': stats["rejected"] for c, stats in classes.items()})]
+    return PlainTextResponse(metrics.registry.render(gauges, counters), media_type="text/plain; version=0.0.4")
 
 @app.get("/test_db") #cette foncion fonctionne
-async def test_db_connection(db: Session = Depends(get_db)):
-    if not connection_status:
+async def test_db_connection(db: AsyncSession = Depends(get_db)):
+    if not (await check_health())["connected"]:
         raise HTTPException(status_code=500, detail="Database connection is not established")
     try:
-        result = db.execute(text("SELECT 1")).fetchone()
+        result = (await db.execute(text("SELECT 1"))).fetchone()
         return {"message": "Database connection is successful!", "result": result[0]}
     except Exception as e:
         print(f"Error during database query: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
 # copié-collé ici mes autres routes et la logique de mon application...
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt tourne dans le pool de hashing.py pour ne pas bloquer les autres routes
+async def verify_password(plain_password, hashed_password):
+    with metrics.timer("auth"):
+        return await hashing.run(pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    with metrics.timer("auth"):
+        return await hashing.run(pwd_context.hash, password)
 
-def get_user(db, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user(db, username: str):
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
 
-def authenticate_user(db, username: str, password: str):
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db, username: str, password: str):
+    user = await get_user(db, username)
+    if not user or not await verify_password(password, user.hashed_password):
         return False
     return user
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(UTC) + timedelta(hours=2, minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.now(UTC)
+    expire = now + timedelta(hours=2, minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def cache_json(route, content, key=None):
+    # Sérialise et compresse une fois, garde toutes les variantes dans le cache de réponses ;
+    # la compression (~100 Ko pour /detail_pilote) tourne hors de la boucle d'événements
+    variants = await asyncio.to_thread(compression.compress, dumps(content))
+    response_cache.set(key or route, variants, ttl=CACHE_TTL[route])
+    return variants
+
+def cached_response(request, variants):
+    # Variante (gzip, br ou brute) acceptée par le client
+    return compression.response(variants, request.headers.get("accept-encoding"))
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    with metrics.timer("auth"):
+        return await _current_user(token, db)
+
+async def _current_user(token, db):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -80,16 +266,34 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    user = get_user(db, username=username)
+    issued_at = payload.get("iat")
+    if AUTH_CLAIMS_ONLY and issued_at is not None and datetime.now(UTC).timestamp() - issued_at < TOKEN_FRESH_SECONDS:
+        return User(username=username)
+    user = user_cache.get(username)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
+        user = await get_user(db, username=username)
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_cache.set(username, user)
     return user
 
 
+async def dataset_etag(request: Request, current_user: User = Depends(get_current_user)):
+    # ETag fort dérivé de la version du jeu de données : 304 sans requête SQL
+    version = await versioning.current_version(async_engine)
+    if version is None:
+        return
+    etag = versioning.make_etag(version, request.url.path, request.url.query, request.headers.get("accept", ""),
+                                compression.negotiate(request.headers.get("accept-encoding")))
+    request.state.etag = etag
+    if versioning.etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
 # Route pour l'authentification
 @app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     access_token = create_access_token(data={"sub": user.username})
@@ -97,16 +301,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @app.post("/users")
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
-        db_user = get_user(db, user.username)
+        db_user = await get_user(db, user.username)
         if db_user:
             raise HTTPException(status_code=400, detail="Username already registered")
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash(user.password)
         new_user = User(username=user.username, hashed_password=hashed_password, email=user.email)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+        user_cache.invalidate(new_user.username)
         return {"message": "User created successfully"}
     except Exception as e:
         # Capture l'exception pour plus de détails
@@ -120,271 +325,310 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
 async def protected_route(current_user: User = Depends(get_current_user)):
     return {"message": f"Hello, {current_user.username} ,THE Best!"}
 
+def require_admin(request: Request):
+    # L'inscription sur /users est libre : un simple compte ne suffit pas
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+# Vide le cache de réponses (à appeler après un chargement script2.py)
+@app.post("/cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_cache():
+    removed = response_cache.invalidate()
+    return {"message": "Cache invalidated", "removed": removed}
+
 # Route pour la requête SQL spécifique des points
 @app.post("/driver_points")
-async def get_driver_points(driver: DriverRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_driver_points(driver: DriverPointsRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if driver.driverId is None and (driver.forename is None or driver.surname is None):
+        raise HTTPException(status_code=400, detail="driverId or forename and surname expected")
     try:
-        query = text("""
-            SELECT r.year, SUM(res.points) as total_points
-            FROM races r
-            JOIN results res ON r.raceId = res.raceId
-            JOIN drivers d ON res.driverId = d.driverId
-            WHERE d.forename = :forename AND d.surname = :surname
-            GROUP BY r.year
-            ORDER BY r.year;
-        """)
-        
-        result = db.execute(query, {"forename": driver.forename, "surname": driver.surname})
+        # Le nom est résolu en driverId (accents et casse ignorés) : la requête filtre sur la clé entière
+        if driver.driverId is not None:
+            driver_ids = [driver.driverId]
+        else:
+            driver_ids = (await driver_index.get_index(db)).resolve(driver.forename, driver.surname)
+        moteur = analytics.get_engine()
+        if not driver_ids:
+            result = []
+        elif moteur is not None:
+            result = moteur.driver_points_ids(driver_ids)
+        else:
+            result = await db.execute(queries.driver_points_by_ids(driver_ids))
         data = [{"year": row[0], "total_points": row[1]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"driverIds": driver_ids, "data": data})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+
+# Autocomplétion des noms de pilotes (accents et casse ignorés)
+@app.get("/drivers/search", dependencies=[Depends(dataset_etag)])
+async def search_drivers(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=DRIVER_SEARCH_MAX),
+                         current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    index = await driver_index.get_index(db)
+    return ORJSONResponse({"data": index.search(q, limit)})
+
+# Route pour les points de plusieurs pilotes en une seule requête
+@app.post("/driver_points/batch")
+async def get_driver_points_batch(drivers: List[DriverRequest], current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    if not drivers or len(drivers) > DRIVER_POINTS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {DRIVER_POINTS_BATCH_MAX} drivers expected")
+    try:
+        # Chaque nom est résolu comme sur /driver_points (accents et casse ignorés), une seule
+        # requête lit ensuite tous les driverId
+        index = await driver_index.get_index(db)
+        resolved = [index.resolve(driver.forename, driver.surname) for driver in drivers]
+        driver_ids = sorted({driver_id for ids in resolved for driver_id in ids})
+        moteur = analytics.get_engine()
+        if not driver_ids:
+            result = []
+        elif moteur is not None:
+            result = moteur.driver_points_batch(driver_ids)
+        else:
+            result = await db.execute(queries.driver_points_batch(driver_ids))
+        by_driver = {}
+        for driver_id, year, total in result:
+            by_driver.setdefault(driver_id, []).append((year, total))
+        data = []
+        for driver, ids in zip(drivers, resolved):
+            # Homonymes : points additionnés par saison, comme sur /driver_points
+            by_year = {}
+            for driver_id in ids:
+                for year, total in by_driver.get(driver_id, []):
+                    previous = by_year.get(year)
+                    by_year[year] = total if previous is None else previous + (total or 0)
+            data.append({"forename": driver.forename, "surname": driver.surname, "driverIds": ids,
+                         "points": [{"year": year, "total_points": by_year[year]} for year in sorted(by_year)]})
+        
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 # Route pour la requête SQL spécifique des abandons par années
-@app.get("/abandon_annee")
-async def get_abandon_annee(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/abandon_annee", dependencies=[Depends(dataset_etag)])
+async def get_abandon_annee(category: List[str] = Query(["brakes"]), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    unknown = sorted(set(category) - set(aggregates.STATUS_CATEGORY_NAMES))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown categories: {', '.join(unknown)} (expected: {', '.join(aggregates.STATUS_CATEGORY_NAMES)})")
     try:
-        query = text("""
-            SELECT r.year, COUNT(*) as total_retirements,
-            COUNT(*) * 100.0 / (SELECT COUNT(*) FROM results WHERE raceId IN (SELECT raceId FROM races WHERE year = r.year)) as retirement_percentage
-            FROM results res
-            JOIN races r ON res.raceId = r.raceId
-            JOIN status s ON res.statusId = s.statusId
-            WHERE s.status LIKE '%Brakes%' --OR s.status LIKE '%Collision%'
-            GROUP BY r.year
-            ORDER BY r.year;
-        """)
-        
-        result = db.execute(query)
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            result = moteur.abandon_annee(category)
+        else:
+            result = await db.execute(queries.ABANDON_ANNEE_AGG, {"categories": category})
         
         data = [{"year": row[0], "total_retirements": row[1],"retirement_percentage": row[2]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 # Route pour la requête SQL spécifique total des pole position par année
-@app.get("/pole_position_annee")
-async def get_pole_position_annee(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/pole_position_annee", dependencies=[Depends(dataset_etag)])
+async def get_pole_position_annee(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT d.forename, d.surname, COUNT(*) as pole_positions
-            FROM qualifying q
-            JOIN drivers d ON q.driverId = d.driverId
-            WHERE q.position = 1
-            GROUP BY d.driverId, d.forename, d.surname
-            ORDER BY pole_positions DESC
-        """)
-        
-        result = db.execute(query)
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            result = moteur.pole_position_annee()
+        else:
+            result = await db.execute(queries.POLE_POSITION_ANNEE_AGG)
         
         data = [{"forename": row[0], "surname": row[1],"pole_positions": row[2]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 # Route pour la requête SQL spécifique vitoire totale par constructeur
-@app.get("/constructor_victory")
-async def get_constructor_victory(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/constructor_victory", dependencies=[Depends(dataset_etag)])
+async def get_constructor_victory(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT co.name, COUNT(*) as wins  
-            FROM results r
-            JOIN constructors co ON r.constructorId = co.constructorId
-            WHERE r.position = '1'
-            GROUP BY co.constructorId, co.name
-            ORDER BY wins DESC
-        """)
-        
-        result = db.execute(query)
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            result = moteur.constructor_victory()
+        else:
+            result = await db.execute(queries.CONSTRUCTOR_VICTORY_AGG)
         
         data = [{"name": row[0], "wins": row[1]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 # Route pour la requête SQL spécifique nombre de courses disputées par circuits
-@app.get("/nbr_course_circuit")
-async def get_nbr_course_circuit(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/nbr_course_circuit", dependencies=[Depends(dataset_etag)])
+async def get_nbr_course_circuit(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT c.name, c.country, COUNT(*) as race_count
-            FROM circuits c
-            JOIN races r ON c.circuitId = r.circuitId
-            GROUP BY c.circuitId, c.name, c.country
-            ORDER BY race_count DESC
-        """)
-        
-        result = db.execute(query)
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            result = moteur.nbr_course_circuit()
+        else:
+            result = await db.execute(queries.NBR_COURSE_CIRCUIT_AGG)
         
         data = [{"name": row[0], "country": row[1],"race_count": row[2]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 # Route pour la requête SQL spécifique nombre de victoire totale par pilote
-@app.get("/nbr_win_driver")
-async def get_nbr_win_driver(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/nbr_win_driver", dependencies=[Depends(dataset_etag)])
+async def get_nbr_win_driver(request: Request, after: str | None = None, limit: int | None = Query(None, ge=1, le=pagination.MAX_LIMIT), fields: str | None = None,
+                             current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    fields = pagination.parse_fields(fields, NBR_WIN_DRIVER_FIELDS)
+    cursor = pagination.decode_cursor(after, (int, int))
+    media_type = streaming.requested_format(request)
     try:
-        query = text("""
-            SELECT d.forename, d.surname, COUNT(*) as victories
-            FROM results r
-            JOIN drivers d ON r.driverId = d.driverId
-            WHERE r.position = '1'
-            GROUP BY d.driverId, d.forename, d.surname
-            ORDER BY victories DESC
-        """)
-        
-        result = db.execute(query)
-        
-        data = [{"forename": row[0], "surname": row[1],"victories": row[2]} for row in result]
-        
-        return {"data": data}
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            rows = pagination.page_in_memory(moteur.nbr_win_driver(with_ids=True), lambda row: (row[3], row[0]),
+                                             cursor, limit, descending=(0,))
+            rows = [dict(zip(("driverId", "forename", "surname", "victories"), row)) for row in rows]
+            if media_type is not None:
+                return streaming.stream_rows(rows, fields, media_type)
+        elif media_type is not None:
+            return streaming.stream_query(queries.nbr_win_driver_page(fields, cursor, limit), fields, media_type)
+        else:
+            rows = (await db.execute(queries.nbr_win_driver_page(fields, cursor, limit))).mappings().all()
+        
+        data = [{f: row[f] for f in fields} for row in rows]
+        
+        response = {"data": data}
+        if limit is not None:
+            response["next"] = pagination.next_cursor([(row["victories"], row["driverId"]) for row in rows], limit)
+        return ORJSONResponse(response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Route pour la requête SQL spécifique afficher la localistion des circuits
-@app.get("/circuit_localisation")
-async def get_circuit_localisation(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/circuit_localisation", dependencies=[Depends(dataset_etag)])
+async def get_circuit_localisation(request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT name,country,lat,lng,url
-            FROM circuits
-        """)
-        
-        result = db.execute(query)
+        body = response_cache.get("/circuit_localisation")
+        if body is None:
+            result = await db.execute(queries.CIRCUIT_LOCALISATION)
+            data = [{"name": row[0], "country": row[1],"lat": row[2],"lng":row[3],"url":row[4]} for row in result]
+            body = await cache_json("/circuit_localisation", {"data": data})
         
-        data = [{"name": row[0], "country": row[1],"lat": row[2],"lng":row[3],"url":row[4]} for row in result]
-        
-        return {"data": data}
+        return cached_response(request, body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
 # Route pour la requête SQL spécifique afficher la liste de tous les pilotes
-@app.get("/detail_pilote")
-async def get_detail_pilote(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/detail_pilote", dependencies=[Depends(dataset_etag)])
+async def get_detail_pilote(request: Request, after: str | None = None, limit: int | None = Query(None, ge=1, le=pagination.MAX_LIMIT), fields: str | None = None,
+                            current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    fields = pagination.parse_fields(fields, DETAIL_PILOTE_FIELDS)
+    cursor = pagination.decode_cursor(after, (int,))
+    # Export NDJSON/CSV : lecture du curseur par lots, sans passer par le cache
+    media_type = streaming.requested_format(request)
+    if media_type is not None:
+        return streaming.stream_query(queries.detail_pilote_page(fields, cursor, limit), fields, media_type)
+    cache_key = f"/detail_pilote?after={after}&limit={limit}&fields={','.join(fields)}"
     try:
-        query = text("""
-            SELECT forename,surname,nationality,url
-            FROM drivers
-        """)
-        
-        result = db.execute(query)
-        
-        data = [{"forename": row[0], "surname": row[1],"nationality": row[2],"url":row[3]} for row in result]
-        
-        return {"data": data}
+        body = response_cache.get(cache_key)
+        if body is None:
+            rows = (await db.execute(queries.detail_pilote_page(fields, cursor, limit))).mappings().all()
+            data = [{f: row[f] for f in fields} for row in rows]
+            content = {"data": data}
+            if limit is not None:
+                content["next"] = pagination.next_cursor([(row["driverId"],) for row in rows], limit)
+            body = await cache_json("/detail_pilote", content, key=cache_key)
+        
+        return cached_response(request, body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Route pour la requête SQL spécifique afficher la liste de tous les pilotes
-@app.get("/detail_constructor")
-async def get_detail_constructor(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/detail_constructor", dependencies=[Depends(dataset_etag)])
+async def get_detail_constructor(request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT name,nationality,url
-            FROM constructors
-            ORDER BY name 
-        """)
+        body = response_cache.get("/detail_constructor")
+        if body is None:
+            result = await db.execute(queries.DETAIL_CONSTRUCTOR)
+            data = [{"name": row[0], "nationality": row[1],"url": row[2]} for row in result]
+            body = await cache_json("/detail_constructor", {"data": data})
         
-        result = db.execute(query)
-        
-        data = [{"name": row[0], "nationality": row[1],"url": row[2]} for row in result]
-        
-        return {"data": data}
+        return cached_response(request, body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 # Route pour la requête SQL spécifique afficher lien wiki vers les infos des grand-prix par année
-@app.get("/info_gp")
-async def get_info_gp(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/info_gp", dependencies=[Depends(dataset_etag)])
+async def get_info_gp(request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT year,url
-            FROM races
-            WHERE round =1
-            ORDER BY year DESC
-        """)
-        
-        result = db.execute(query)
+        body = response_cache.get("/info_gp")
+        if body is None:
+            result = await db.execute(queries.INFO_GP)
+            data = [{"year": row[0], "url": row[1]} for row in result]
+            body = await cache_json("/info_gp", {"data": data})
         
-        data = [{"year": row[0], "url": row[1]} for row in result]
-        
-        return {"data": data}
+        return cached_response(request, body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Route pour la requête SQL recherche par annee et rank 
 @app.post("/result_year")
-async def get_result_year(result1: PosRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_result_year(result1: PosRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-                     SELECT r.date,c.country,r.name,d.forename,d.surname,res.position
-                     FROM races r 
-                     JOIN  results res ON r.raceId= res.raceId
-                     JOIN drivers d ON  d.driverId=res.driverId
-                     JOIN circuits c ON c.circuitId=r.circuitId
-                     WHERE r.year= :year AND res.position= :rank
-                     ORDER BY r.date
-        """)
-        
-        result = db.execute(query, {"year": result1.year, "rank": result1.rank})
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            result = moteur.result_year(result1.year, result1.rank)
+        else:
+            result = await db.execute(queries.RESULT_YEAR, {"year": result1.year, "rank": result1.rank})
         data = [{"date": row[0], "country": row[1], "name": row[2], "forename": row[3], "surname": row[4], "rank": row[5]} for row in result]
         
-        return {"data": data}
+        return ORJSONResponse({"data": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Route pour la requête SQL spécifique afficher la liste de tous les pilotes
-@app.get("/tout_constructeur")
-async def get_tout_constructeur(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.get("/tout_constructeur", dependencies=[Depends(dataset_etag)])
+async def get_tout_constructeur(request: Request, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     try:
-        query = text("""
-            SELECT name
-            FROM constructors
-            ORDER BY name
-        """)
-        
-        result = db.execute(query)
+        body = response_cache.get("/tout_constructeur")
+        if body is None:
+            result = await db.execute(queries.TOUT_CONSTRUCTEUR)
+            data = [{"name": row[0]} for row in result]
+            body = await cache_json("/tout_constructeur", {"data": data})
         
-        data = [{"name": row[0]} for row in result]
-        
-        return {"data": data}
+        return cached_response(request, body)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Route pour la requête SQL recherche par annee et rank 
 @app.post("/result_pilote_constructeur")
-async def get_result_pilote_constructeur(result : PosConstru, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_result_pilote_constructeur(request: Request, result : PosConstru, after: str | None = None, limit: int | None = Query(None, ge=1, le=pagination.MAX_LIMIT), fields: str | None = None,
+                                         current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    fields = pagination.parse_fields(fields, RESULT_PILOTE_CONSTRUCTEUR_FIELDS)
+    cursor = pagination.decode_cursor(after, (int, str, str))
+    # La clé de sortie historique est "forname", la colonne SQL "forename"
+    columns = ["forename" if f == "forname" else f for f in fields]
+    media_type = streaming.requested_format(request)
     try:
-        query = text("""
-                    SELECT DISTINCT c.name AS 'ecurie' ,
-				d.forename,
-				d.surname,
-				MAX(ra.year+1)-MIN(ra.year) AS'annee',
-				MIN(ra.year) AS'debut',
-				MAX(ra.year) AS'fin',
-				COUNT(res.points ) AS 'nbr_gp'
-FROM drivers d  
-	JOIN results res on d.driverId=res.driverId
-	JOIN constructors c ON c.constructorId=res.constructorId 
-	JOIN races ra ON res.raceId =ra.raceId
-WHERE c.name = :name
-GROUP BY c.name, d.forename, d.surname
-ORDER BY annee DESC
-        """)
-        
-        result = db.execute(query, {"name": result.constru})
-        data = [{"ecurie": row[0], "forname": row[1], "surname": row[2], "annee": row[3], "debut": row[4], "fin": row[5],"nbr_gp":row[6]} for row in result]
-        
-        return {"data": data}
+        moteur = analytics.get_engine()
+        if moteur is not None:
+            rows = sorted(moteur.result_pilote_constructeur(result.constru), key=lambda row: (-row[3], row[1], row[2]))
+            rows = pagination.page_in_memory(rows, lambda row: (row[3], row[1], row[2]), cursor, limit, descending=(0,))
+            rows = [dict(zip(("ecurie", "forename", "surname", "annee", "debut", "fin", "nbr_gp"), row)) for row in rows]
+            if media_type is not None:
+                return streaming.stream_rows(rows, fields, media_type, columns)
+        else:
+            constructor_ids = await constructor_index.resolve(db, result.constru)
+            query = queries.result_pilote_constructeur_page(constructor_ids, columns, cursor, limit)
+            if media_type is not None:
+                return streaming.stream_query(query, fields, media_type, columns)
+            rows = (await db.execute(query)).mappings().all()
+        data = [{f: row[c] for f, c in zip(fields, columns)} for row in rows]
+        
+        response = {"data": data}
+        if limit is not None:
+            response["next"] = pagination.next_cursor([(row["annee"], row["forename"], row["surname"]) for row in rows], limit)
+        return ORJSONResponse(response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,141 @@
+"""Métriques par route au format texte Prometheus (GET /metrics).
+
+Chaque requête est découpée en phases :
+    total      durée complète vue par le middleware
+    queue      attente d'une place dans la file de sa classe (admission.py)
+    auth       get_current_user et bcrypt (la lecture de users reste dans db)
+    db         exécution des requêtes SQL (hooks SQLAlchemy ; les pilotes
+               asynchrones lisent les lignes pendant l'exécution, fetch compris)
+    serialize  encodage JSON (responses.dumps)
+    other      le reste : construction des dicts, validation, middlewares
+
+Les durées sont accumulées dans un dict porté par une ContextVar posée par le
+middleware, puis versées dans des histogrammes à buckets fixes : la mémoire ne
+dépend que du nombre de routes, pas du nombre de requêtes.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ("queue", "auth", "db", "serialize")
+
+_phases = contextvars.ContextVar("f1_request_phases", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # dernier compteur : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}  # (méthode, route, phase) -> Histogram
+        self.requests = {}    # (méthode, route, statut) -> nombre
+        self.queries = 0
+
+    def count_query(self):
+        with self._lock:
+            self.queries += 1
+
+    def record_request(self, method, route, status_code, total, phases):
+        with self._lock:
+            key = (method, route, str(status_code))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            other = total - sum(phases.values())
+            for phase, value in (("total", total), *phases.items(), ("other", max(other, 0.0))):
+                histogram = self.histograms.get((method, route, phase))
+                if histogram is None:
+                    histogram = self.histograms[(method, route, phase)] = Histogram()
+                histogram.observe(value)
+
+    def render(self, gauges=(), counters=()):
+        """Texte d'exposition Prometheus ; `gauges` et `counters` : (nom, aide, {labels: valeur})."""
+        lines = ["# HELP f1_request_duration_seconds Request time per route, split by phase.",
+                 "# TYPE f1_request_duration_seconds histogram"]
+        with self._lock:
+            for (method, route, phase), h in sorted(self.histograms.items()):
+                labels = f'method="{method}",route="{route}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'f1_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'f1_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"f1_request_duration_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"f1_request_duration_seconds_count{{{labels}}} {h.count}")
+            lines += ["# HELP f1_requests_total Requests per route and status code.",
+                      "# TYPE f1_requests_total counter"]
+            for (method, route, status_code), count in sorted(self.requests.items()):
+                lines.append(f'f1_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}')
+            lines += ["# HELP f1_db_queries_total SQL statements executed.",
+                      "# TYPE f1_db_queries_total counter",
+                      f"f1_db_queries_total {self.queries}"]
+        for kind, series in (("gauge", gauges), ("counter", counters)):
+            for name, help_text, values in series:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in values.items():
+                    lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def start_request():
+    phases = dict.fromkeys(PHASES, 0.0)
+    _phases.set(phases)
+    return phases
+
+
+def add_time(phase, seconds):
+    phases = _phases.get()
+    if phases is not None:
+        phases[phase] += seconds
+
+
+@contextmanager
+def timer(phase):
+    """Ajoute la durée du bloc à `phase`, moins le temps déjà compté dans une autre
+    phase pendant le bloc (ex. la lecture de users dans auth reste dans db)."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    counted = sum(phases.values())
+    try:
+        yield
+    finally:
+        nested = sum(phases.values()) - counted
+        phases[phase] += time.perf_counter() - start - nested
+
+
+def install_db_hooks(sync_engine):
+    """Chronomètre chaque requête SQL de l'engine (pour l'async : async_engine.sync_engine)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("f1_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["f1_query_start"].pop()
+        registry.count_query()
+        add_time("db", elapsed)
@@ -0,0 +1,69 @@
+"""Pagination par clé (keyset) et projection de champs pour les routes de liste.
+
+Le curseur `after` est opaque pour le client : c'est la clé de tri de la
+dernière ligne reçue, encodée en JSON puis en base64 url-safe. La page suivante
+se lit avec un WHERE sur cette clé (aucun OFFSET à parcourir).
+"""
+import base64
+import json
+
+from fastapi import HTTPException
+
+MAX_LIMIT = 1000
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types):
+    """Valeurs de la clé contenues dans le curseur, une par type de `types` (ex. (int, str))."""
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Type de chaque composante vérifié : une chaîne à la place d'un entier serait
+    # comparée telle quelle par SQLite et refusée par SQL Server (erreur 500)
+    for value, expected in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_fields(fields, allowed):
+    """Liste des champs demandés (`fields=a,b`), dans l'ordre de `allowed`."""
+    if not fields:
+        return list(allowed)
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [f for f in allowed if f in requested]
+
+
+def next_cursor(keys, limit):
+    # Curseur de la page suivante, None si la page n'est pas pleine
+    if limit is None or len(keys) < limit:
+        return None
+    return encode_cursor(keys[-1])
+
+
+def page_in_memory(rows, key, cursor, limit, descending=()):
+    """Applique le curseur et la limite à des lignes déjà triées selon `key`.
+
+    `descending` donne l'indice des composantes de la clé triées en décroissant.
+    """
+    if cursor is not None:
+        signed = _signed(cursor, descending)
+        rows = [row for row in rows if _signed(key(row), descending) > signed]
+    return rows[:limit] if limit is not None else rows
+
+
+def _signed(values, descending):
+    return tuple(-v if i in descending else v for i, v in enumerate(values))
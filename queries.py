@@ -0,0 +1,247 @@
+from sqlalchemy import String, and_, bindparam, column, func, or_, select, table, text
+
+from aggregates import agg_driver_constructor_tenure, agg_driver_season_points, agg_driver_wins
+
+# Requêtes SQL utilisées par les routes de main.py.
+# Elles servent aussi de référence (oracle) pour le moteur en mémoire d'analytics.py.
+# SQL neutre (pas de TOP, d'alias entre quotes ni de fonction T-SQL) : elles
+# tournent aussi sur la base locale SQLite de local_db.py.
+
+DRIVER_POINTS = text("""
+    SELECT r.year, SUM(res.points) as total_points
+    FROM races r
+    JOIN results res ON r.raceId = res.raceId
+    JOIN drivers d ON res.driverId = d.driverId
+    WHERE d.forename = :forename AND d.surname = :surname
+    GROUP BY r.year
+    ORDER BY r.year
+""")
+
+ABANDON_ANNEE = text("""
+    SELECT r.year, COUNT(*) as total_retirements,
+    COUNT(*) * 100.0 / (SELECT COUNT(*) FROM results WHERE raceId IN (SELECT raceId FROM races WHERE year = r.year)) as retirement_percentage
+    FROM results res
+    JOIN races r ON res.raceId = r.raceId
+    JOIN status s ON res.statusId = s.statusId
+    WHERE s.status LIKE '%Brakes%' --OR s.status LIKE '%Collision%'
+    GROUP BY r.year
+    ORDER BY r.year
+""")
+
+POLE_POSITION_ANNEE = text("""
+    SELECT d.forename, d.surname, COUNT(*) as pole_positions
+    FROM qualifying q
+    JOIN drivers d ON q.driverId = d.driverId
+    WHERE q.position = 1
+    GROUP BY d.driverId, d.forename, d.surname
+    ORDER BY pole_positions DESC
+""")
+
+CONSTRUCTOR_VICTORY = text("""
+    SELECT co.name, COUNT(*) as wins
+    FROM results r
+    JOIN constructors co ON r.constructorId = co.constructorId
+    WHERE r.position = 1
+    GROUP BY co.constructorId, co.name
+    ORDER BY wins DESC
+""")
+
+NBR_COURSE_CIRCUIT = text("""
+    SELECT c.name, c.country, COUNT(*) as race_count
+    FROM circuits c
+    JOIN races r ON c.circuitId = r.circuitId
+    GROUP BY c.circuitId, c.name, c.country
+    ORDER BY race_count DESC
+""")
+
+NBR_WIN_DRIVER = text("""
+    SELECT d.forename, d.surname, COUNT(*) as victories
+    FROM results r
+    JOIN drivers d ON r.driverId = d.driverId
+    WHERE r.position = 1
+    GROUP BY d.driverId, d.forename, d.surname
+    ORDER BY victories DESC
+""")
+
+CIRCUIT_LOCALISATION = text("""
+    SELECT name,country,lat,lng,url
+    FROM circuits
+""")
+
+DETAIL_CONSTRUCTOR = text("""
+    SELECT name,nationality,url
+    FROM constructors
+    ORDER BY name
+""")
+
+INFO_GP = text("""
+    SELECT year,url
+    FROM races
+    WHERE round =1
+    ORDER BY year DESC
+""")
+
+RESULT_YEAR = text("""
+    SELECT r.date,c.country,r.name,d.forename,d.surname,res.position
+    FROM races r
+    JOIN  results res ON r.raceId= res.raceId
+    JOIN drivers d ON  d.driverId=res.driverId
+    JOIN circuits c ON c.circuitId=r.circuitId
+    WHERE r.year= :year AND res.position= :rank
+    ORDER BY r.date
+""")
+
+TOUT_CONSTRUCTEUR = text("""
+    SELECT name
+    FROM constructors
+    ORDER BY name
+""")
+
+RESULT_PILOTE_CONSTRUCTEUR = text("""
+    SELECT DISTINCT c.name AS ecurie,
+        d.forename,
+        d.surname,
+        MAX(ra.year+1)-MIN(ra.year) AS annee,
+        MIN(ra.year) AS debut,
+        MAX(ra.year) AS fin,
+        COUNT(res.points) AS nbr_gp
+    FROM drivers d
+        JOIN results res on d.driverId=res.driverId
+        JOIN constructors c ON c.constructorId=res.constructorId
+        JOIN races ra ON res.raceId =ra.raceId
+    WHERE c.name = :name
+    GROUP BY c.name, d.forename, d.surname
+    ORDER BY annee DESC
+""")
+
+
+# Lecture des tables d'agrégats matérialisées (aggregates.py) : les requêtes
+# ci-dessus restent la référence utilisée pour les reconstruire et les vérifier.
+
+DRIVER_POINTS_AGG = text("""
+    SELECT p.year, SUM(p.total_points) as total_points
+    FROM drivers d
+    JOIN agg_driver_season_points p ON p.driverId = d.driverId
+    WHERE d.forename = :forename AND d.surname = :surname
+    GROUP BY p.year
+    ORDER BY p.year
+""")
+
+# Un seul passage sur les comptes par année et catégorie de statut (plus de
+# sous-requête corrélée par année) ; :categories est une liste
+ABANDON_ANNEE_AGG = text("""
+    SELECT year,
+        SUM(CASE WHEN category IN :categories THEN result_count ELSE 0 END) as total_retirements,
+        SUM(CASE WHEN category IN :categories THEN result_count ELSE 0 END) * 100.0 / SUM(result_count) as retirement_percentage
+    FROM agg_year_status_category
+    GROUP BY year
+    HAVING SUM(CASE WHEN category IN :categories THEN result_count ELSE 0 END) > 0
+    ORDER BY year
+""").bindparams(bindparam("categories", type_=String, expanding=True))
+
+RESULT_PILOTE_CONSTRUCTEUR_AGG = text("""
+    SELECT c.name AS ecurie,
+        d.forename,
+        d.surname,
+        MAX(t.last_year+1)-MIN(t.first_year) AS annee,
+        MIN(t.first_year) AS debut,
+        MAX(t.last_year) AS fin,
+        SUM(t.starts) AS nbr_gp
+    FROM agg_driver_constructor_tenure t
+        JOIN constructors c ON c.constructorId=t.constructorId
+        JOIN drivers d ON d.driverId=t.driverId
+    WHERE c.name = :name
+    GROUP BY c.name, d.forename, d.surname
+    ORDER BY annee DESC
+""")
+
+POLE_POSITION_ANNEE_AGG = text("""
+    SELECT forename, surname, pole_positions
+    FROM agg_driver_poles
+    ORDER BY pole_positions DESC
+""")
+
+CONSTRUCTOR_VICTORY_AGG = text("""
+    SELECT name, wins
+    FROM agg_constructor_wins
+    ORDER BY wins DESC
+""")
+
+NBR_COURSE_CIRCUIT_AGG = text("""
+    SELECT name, country, race_count
+    FROM agg_circuit_races
+    ORDER BY race_count DESC
+""")
+
+
+# Versions paginées (keyset) avec projection des colonnes, construites avec
+# SQLAlchemy Core pour que LIMIT/TOP soit généré selon le dialecte.
+
+drivers_table = table("drivers", column("driverId"), column("forename"), column("surname"),
+                      column("nationality"), column("url"))
+constructors_table = table("constructors", column("constructorId"), column("name"))
+
+
+def detail_pilote_page(fields, cursor=None, limit=None):
+    d = drivers_table
+    query = select(d.c.driverId, *[d.c[f] for f in fields]).order_by(d.c.driverId)
+    if cursor is not None:
+        query = query.where(d.c.driverId > cursor[0])
+    return query.limit(limit) if limit is not None else query
+
+
+def nbr_win_driver_page(fields, cursor=None, limit=None):
+    # Lecture de la table d'agrégats, seules les colonnes demandées sont lues
+    w = agg_driver_wins
+    columns = [w.c[f] for f in fields if f != "victories"]
+    query = select(w.c.driverId, w.c.victories, *columns).order_by(w.c.victories.desc(), w.c.driverId)
+    if cursor is not None:
+        victories, driver_id = cursor
+        query = query.where(or_(w.c.victories < victories,
+                                and_(w.c.victories == victories, w.c.driverId > driver_id)))
+    return query.limit(limit) if limit is not None else query
+
+
+def result_pilote_constructeur_page(constructor_ids, fields, cursor=None, limit=None):
+    # Lecture de agg_driver_constructor_tenure par constructorId (résolus par
+    # constructor_index.py) ; regroupement par nom comme la requête d'origine
+    t, d, c = agg_driver_constructor_tenure, drivers_table, constructors_table
+    tenure = (select(c.c.name.label("ecurie"), d.c.forename, d.c.surname,
+                     (func.max(t.c.last_year + 1) - func.min(t.c.first_year)).label("annee"),
+                     func.min(t.c.first_year).label("debut"),
+                     func.max(t.c.last_year).label("fin"),
+                     func.sum(t.c.starts).label("nbr_gp"))
+              .select_from(t.join(d, d.c.driverId == t.c.driverId)
+                           .join(c, c.c.constructorId == t.c.constructorId))
+              .where(t.c.constructorId.in_(constructor_ids))
+              .group_by(c.c.name, d.c.forename, d.c.surname)
+              .subquery())
+    keys = [tenure.c.annee, tenure.c.forename, tenure.c.surname]
+    columns = [tenure.c[f] for f in fields if f not in ("annee", "forename", "surname")]
+    query = select(*keys, *columns).order_by(tenure.c.annee.desc(), tenure.c.forename, tenure.c.surname)
+    if cursor is not None:
+        annee, forename, surname = cursor
+        query = query.where(or_(
+            tenure.c.annee < annee,
+            and_(tenure.c.annee == annee, or_(
+                tenure.c.forename > forename,
+                and_(tenure.c.forename == forename, tenure.c.surname > surname)))))
+    return query.limit(limit) if limit is not None else query
+
+
+def driver_points_by_ids(driver_ids):
+    # Filtre sur la clé entière (driverId résolus par driver_index.py)
+    p = agg_driver_season_points
+    return (select(p.c.year, func.sum(p.c.total_points).label("total_points"))
+            .where(p.c.driverId.in_(driver_ids))
+            .group_by(p.c.year)
+            .order_by(p.c.year))
+
+
+def driver_points_batch(driver_ids):
+    # Points par pilote et par saison pour plusieurs pilotes (driverId résolus) en une seule requête
+    p = agg_driver_season_points
+    return (select(p.c.driverId, p.c.year, func.sum(p.c.total_points).label("total_points"))
+            .where(p.c.driverId.in_(driver_ids))
+            .group_by(p.c.driverId, p.c.year)
+            .order_by(p.c.driverId, p.c.year))
@@ -0,0 +1,35 @@
+"""Sérialisation JSON rapide avec orjson.
+
+ORJSONResponse est la classe de réponse par défaut de l'application. Les routes
+la renvoient directement : FastAPI ne passe alors plus le contenu dans
+jsonable_encoder, et orjson encode les dicts en une passe. Les dates sont gérées
+nativement par orjson ; les Decimal renvoyés par SQL Server (COUNT(*) * 100.0,
+colonnes NUMERIC) et les scalaires NumPy du moteur en mémoire passent par
+_default.
+"""
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+import metrics
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content):
+    with metrics.timer("serialize"):
+        return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
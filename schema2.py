@@ -4,6 +4,12 @@ class DriverRequest(BaseModel):
     forename: str
     surname: str
 
+# /driver_points : driverId (résolu via /drivers/search) ou prénom + nom
+class DriverPointsRequest(BaseModel):
+    driverId: int | None = None
+    forename: str | None = None
+    surname: str | None = None
+
 class PosRequest(BaseModel):
     year:int
     rank:int
@@ -1,7 +1,10 @@
 import pandas as pd
 from sqlalchemy import create_engine
-import pyodbc
 import os
+from versioning import hash_files
+from aggregates import refresh_aggregates
+from indexes import create_indexes
+from analytics import write_snapshot
 
 def get_sqlalchemy_engine():
     engine = create_engine(
@@ -17,8 +20,26 @@ def get_pyodbc_connection():
         r"UID=technofuturtic\f.renaux;"
         r"Trusted_Connection=yes;"
     )
+    import pyodbc  # importé ici : local_db.py réutilise ce module sans pilote ODBC
     return pyodbc.connect(conn_str)
 
+# Fichiers CSV nettoyés et table de destination (aussi utilisé par local_db.py)
+FILES_AND_TABLES = {
+    './circuit_ok.csv': 'circuits',
+    './race_ok.csv': 'races',
+    './drivers_ok.csv': 'drivers',
+    './constructors_ok.csv': 'constructors',
+    './constructor_results_ok.csv': 'constructor_results',
+    './constructor_standings_ok.csv': 'constructor_standings',
+    './driver_standings_ok.csv': 'driver_standings',
+    './results_ok.csv': 'results',
+    './lap_times_ok.csv': 'lap_times',
+    './pit_stops_ok.csv': 'pit_stops',
+    './qualifying_ok.csv': 'qualifying',
+    './seasons_ok.csv': 'seasons',
+    './status_ok.csv': 'status'
+}
+
 def create_tables(cursor):
      # Creation la table circuits 1
     cursor.execute('''
@@ -171,17 +192,17 @@ def create_tables(cursor):
             constructorId INT,
             number VARCHAR(255),
             grid INT,
-            position VARCHAR(255),
+            position INT,
             positionText VARCHAR(255),
             positionOrder INT,
             points FLOAT,
             laps INT,
             time VARCHAR(255),
-            milliseconds VARCHAR(255),
-            fastestLap VARCHAR(255),
-            rank VARCHAR(255),
+            milliseconds INT,
+            fastestLap INT,
+            rank INT,
             fastestLapTime VARCHAR(255),
-            fastestLapSpeed VARCHAR(255),
+            fastestLapSpeed FLOAT,
             statusId INT,
             FOREIGN KEY (raceId) REFERENCES races(raceId),
             FOREIGN KEY (driverId) REFERENCES drivers(driverId),
@@ -204,9 +225,26 @@ def create_tables(cursor):
             statusId INT PRIMARY KEY,
             status VARCHAR(255)
         );
+    ''')
+                # Création table dataset_version 14 (version des données chargées, lue par l'API)
+    cursor.execute('''
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='dataset_version' AND xtype='U')
+        CREATE TABLE dataset_version (
+            id INT PRIMARY KEY,
+            version VARCHAR(64),
+            loaded_at DATETIME
+        );
     ''')
     cursor.connection.commit()
 
+def update_dataset_version(cursor, file_paths):
+    # Hash du contenu des CSV chargés : change l'ETag des routes de l'API
+    version = hash_files(file_paths)
+    cursor.execute("DELETE FROM dataset_version WHERE id = 1")
+    cursor.execute("INSERT INTO dataset_version (id, version, loaded_at) VALUES (1, ?, GETDATE())", version)
+    cursor.connection.commit()
+    print(f"Version du jeu de données : {version}")
+
 def preprocess_dataframe(df):
     # Convertir les colonnes de date en datetime
     date_columns = ['date', 'dob']  # Ajoutez d'autres noms de colonnes de date si nécessaire
@@ -214,9 +252,15 @@ def preprocess_dataframe(df):
         if col in df.columns:
             df[col] = pd.to_datetime(df[col], errors='coerce')
     
-    # Gérer les valeurs NULL pour les colonnes numériques
-    numeric_columns = ['number', 'position', 'milliseconds', 'fastestLap', 'rank']
-    for col in numeric_columns:
+    # Gérer les valeurs NULL pour les colonnes numériques ('\N' devient NULL).
+    # Int64 (entier nullable) pour que les colonnes INT reçoivent 1 et non 1.0 ;
+    # positionText reste en texte pour l'affichage ('R', 'D'...).
+    integer_columns = ['number', 'position', 'milliseconds', 'fastestLap', 'rank']
+    for col in integer_columns:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    float_columns = ['fastestLapSpeed']
+    for col in float_columns:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors='coerce')
     
@@ -249,27 +293,19 @@ def main():
         
         engine = get_sqlalchemy_engine()
         
-        files_and_tables = {
-        './circuit_ok.csv': 'circuits',
-        './race_ok.csv': 'races',
-        './drivers_ok.csv': 'drivers',
-        './constructors_ok.csv': 'constructors',
-        './constructor_results_ok.csv': 'constructor_results',
-        './constructor_standings_ok.csv': 'constructor_standings',
-        './driver_standings_ok.csv': 'driver_standings',
-        './results_ok.csv': 'results',
-        './lap_times_ok.csv': 'lap_times',
-        './pit_stops_ok.csv': 'pit_stops',
-        './qualifying_ok.csv': 'qualifying',
-        './seasons_ok.csv': 'seasons',
-        './status_ok.csv': 'status'
-        }
-        
-        for file_path, table_name in files_and_tables.items():
+        loaded_files = []
+        for file_path, table_name in FILES_AND_TABLES.items():
             if os.path.exists(file_path):
                 load_csv_to_sql(file_path, table_name, engine)
+                loaded_files.append(file_path)
             else:
                 print(f"Le fichier {file_path} n'existe pas.")
+
+        create_indexes(engine)
+        refresh_aggregates(engine)
+        update_dataset_version(cursor, loaded_files)
+        # Instantané du moteur d'analyse écrit une fois ici, mappé ensuite par les workers
+        write_snapshot(engine)
     
     except Exception as e:
         print(f"Une erreur est survenue : {str(e)}")
@@ -0,0 +1,123 @@
+"""Journal des requêtes SQL lentes, avec plan d'exécution estimé.
+
+Chaque requête plus longue que F1_SLOW_QUERY_MS est écrite (une ligne JSON :
+requête, paramètres, durée, nombre de lignes) dans F1_SLOW_QUERY_LOG, fichier
+tournant (F1_SLOW_QUERY_LOG_BYTES, F1_SLOW_QUERY_LOG_BACKUPS). Les paramètres
+des requêtes sur les tables de REDACTED_TABLES (users : mot de passe haché,
+e-mail) sont masqués. Pour les F1_SLOW_QUERY_PLANS premières occurrences de
+chaque requête, le plan estimé (SHOWPLAN_XML sous SQL Server, EXPLAIN QUERY
+PLAN sous SQLite) est ajouté.
+
+Le plan est demandé dans un thread, sur l'engine synchrone : la requête de
+l'utilisateur n'attend pas, et la connexion asynchrone n'est pas réutilisée
+pendant son propre événement.
+"""
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+import indexes
+
+SLOW_QUERY_MS = float(os.getenv("F1_SLOW_QUERY_MS", "500"))  # 0 : journal désactivé
+SLOW_QUERY_LOG = os.getenv("F1_SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("F1_SLOW_QUERY_LOG_BYTES", str(5 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("F1_SLOW_QUERY_LOG_BACKUPS", "3"))
+SLOW_QUERY_PLANS = int(os.getenv("F1_SLOW_QUERY_PLANS", "3"))
+# Tables dont les paramètres ne sont jamais écrits dans le journal
+REDACTED_TABLES = ("users",)
+REDACTED = "[redacted]"
+# Au-delà, plus aucun plan n'est capturé (borne la mémoire du compteur)
+MAX_TRACKED_STATEMENTS = 1000
+
+logger = logging.getLogger("f1.slow_queries")
+logger.propagate = False
+
+_occurrences = {}  # requête -> nombre d'occurrences lentes
+_lock = threading.Lock()
+_plan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-plan")
+_redacted_pattern = re.compile(r"\b(%s)\b" % "|".join(REDACTED_TABLES), re.IGNORECASE)
+
+
+def _setup_logger():
+    if not logger.handlers:
+        handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                      backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8",
+                                      delay=True)  # fichier ouvert à la première requête lente
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def _row_count(cursor):
+    rowcount = getattr(cursor, "rowcount", -1)
+    if rowcount is not None and rowcount >= 0:
+        return rowcount
+    # Les curseurs des pilotes asynchrones (aiosqlite, aioodbc) ont déjà lu les lignes
+    rows = getattr(cursor, "_rows", None)
+    return len(rows) if rows is not None else None
+
+
+def _loggable_parameters(statement, parameters):
+    return REDACTED if parameters and _redacted_pattern.search(statement) else parameters
+
+
+def _write(record):
+    logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def _write_with_plan(plan_engine, record, parameters):
+    try:
+        with plan_engine.connect() as connection:
+            _, record["plan"] = indexes.explain_sql(connection, record["statement"], parameters)
+    except Exception as e:
+        record["plan_error"] = str(e)
+    _write(record)
+
+
+def _should_capture_plan(statement):
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+    with _lock:
+        count = _occurrences.get(statement)
+        if count is None:
+            if len(_occurrences) >= MAX_TRACKED_STATEMENTS:
+                return False
+            count = 0
+        _occurrences[statement] = count + 1
+        return count < SLOW_QUERY_PLANS
+
+
+def install(sync_engine, plan_engine):
+    """Surveille les requêtes de `sync_engine` (async_engine.sync_engine pour les routes)."""
+    if SLOW_QUERY_MS <= 0:
+        return
+    _setup_logger()
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("f1_slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["f1_slow_query_start"].pop()) * 1000
+        if duration_ms < SLOW_QUERY_MS:
+            return
+        record = {
+            "time": datetime.datetime.now(datetime.UTC).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 2),
+            "rows": _row_count(cursor),
+            "statement": statement,
+            "parameters": _loggable_parameters(statement, parameters),
+        }
+        if not executemany and _should_capture_plan(statement):
+            _plan_executor.submit(_write_with_plan, plan_engine, record, parameters)
+        else:
+            _write(record)
@@ -0,0 +1,112 @@
+"""Instantané des colonnes du moteur d'analyse, partagé entre workers.
+
+Sous plusieurs workers uvicorn, chaque processus chargerait sa propre copie des
+tables d'analytics.py. L'instantané écrit une fois chaque colonne dans un
+fichier .npy, plus un manifest.json portant la version du jeu de données
+(dataset_version). Les workers ouvrent ces fichiers en lecture seule avec
+np.load(mmap_mode="r") : le système garde une seule copie physique dans le
+cache de pages, et un nouveau worker démarre sans relire la base.
+
+Disposition de F1_SNAPSHOT_DIR :
+    manifest.json        version, répertoire courant, colonnes (fichier, type)
+    v-<version>-<id>/    un fichier <table>.<colonne>.npy par colonne
+
+Le manifest est remplacé atomiquement (os.replace) : un lecteur voit soit
+l'ancien instantané, soit le nouveau complet. Les répertoires qu'il ne
+référence pas sont supprimés quand c'est possible (un fichier encore mappé
+reste lisible sous Linux ; sous Windows la suppression échoue et sera retentée
+à la prochaine écriture).
+"""
+import datetime
+import json
+import os
+import shutil
+import uuid
+
+try:
+    import numpy as np
+except ImportError:  # même condition que le moteur d'analytics.py
+    np = None
+
+SNAPSHOT_DIR = os.getenv("F1_SNAPSHOT_DIR", "analytics_snapshot")  # vide : désactivé
+FORMAT = 1
+MANIFEST = "manifest.json"
+
+
+def _storable(values):
+    # Les colonnes objet ne se mappent pas : texte en unicode fixe, dates en datetime64
+    if values.dtype != object:
+        return values, "array"
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, (datetime.date, datetime.datetime)):
+        return np.array(values, dtype="datetime64[D]"), "date"
+    return np.array(["" if v is None else str(v) for v in values], dtype=str), "text"
+
+
+def read_manifest(directory=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write(tables, version, directory=SNAPSHOT_DIR):
+    """Écrit les colonnes {table: {colonne: array}} et publie le manifest de `version`."""
+    os.makedirs(directory, exist_ok=True)
+    name = f"v-{version[:16]}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.join(directory, name))
+    columns = {}
+    for table, table_columns in tables.items():
+        for column, values in table_columns.items():
+            array, kind = _storable(values)
+            file_name = f"{table}.{column}.npy"
+            np.save(os.path.join(directory, name, file_name), array)
+            columns.setdefault(table, {})[column] = {"file": file_name, "kind": kind, "rows": len(array)}
+    manifest = {
+        "format": FORMAT,
+        "version": version,
+        "directory": name,
+        "created_at": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+        "tables": columns,
+    }
+    temporary = os.path.join(directory, f"{MANIFEST}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary, os.path.join(directory, MANIFEST))
+    _remove_old(directory)
+    return manifest
+
+
+def open_tables(version, directory=SNAPSHOT_DIR):
+    """Colonnes mappées en lecture seule, ou None si l'instantané manque ou n'est pas à `version`."""
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get("format") != FORMAT or manifest.get("version") != version:
+        return None
+    path = os.path.join(directory, manifest["directory"])
+    tables = {}
+    try:
+        for table, table_columns in manifest["tables"].items():
+            for column, info in table_columns.items():
+                file_path = os.path.join(path, info["file"])
+                # Un fichier vide ne peut pas être mappé
+                array = np.load(file_path, mmap_mode="r" if info["rows"] else None)
+                if info["kind"] == "date":
+                    array = array.astype(object)  # datetime.date, comme lu depuis la base
+                tables.setdefault(table, {})[column] = array
+    except (OSError, ValueError, KeyError):
+        # Instantané remplacé et supprimé pendant la lecture : relu depuis la base
+        return None
+    return tables
+
+
+def _remove_old(directory):
+    # Tout répertoire que le manifest publié ne référence pas : autres versions, et
+    # copies de la même version écrites par des workers en concurrence (celui dont
+    # le répertoire disparaît en cours d'écriture garde ses colonnes en mémoire)
+    manifest = read_manifest(directory)
+    current = manifest.get("directory") if manifest else None
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if entry.startswith("v-") and entry != current and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,72 @@
+"""Réponses en flux (NDJSON ou CSV) pour les exports volumineux.
+
+Avec `Accept: application/x-ndjson` ou `Accept: text/csv`, les routes de liste
+lisent le curseur de la base par lots de STREAM_BATCH_SIZE lignes et envoient
+chaque lot dès qu'il est encodé : la mémoire reste constante et le premier
+octet part sans attendre la fin de la requête.
+
+La session est ouverte dans le générateur lui-même, car celle de get_db est
+fermée avant l'envoi du corps de la réponse.
+"""
+import csv
+import io
+import os
+
+from fastapi.responses import StreamingResponse
+
+from database import AsyncSessionLocal
+from responses import dumps
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+STREAM_BATCH_SIZE = int(os.getenv("F1_STREAM_BATCH_SIZE", "500"))
+
+
+def requested_format(request):
+    """NDJSON ou CSV si le client le demande dans Accept, sinon None (JSON classique)."""
+    accept = request.headers.get("accept", "")
+    for media_type in (NDJSON, CSV):
+        if media_type in accept:
+            return media_type
+    return None
+
+
+async def _query_batches(query, batch_size):
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for batch in result.mappings().partitions(batch_size):
+            yield batch
+
+
+async def _list_batches(rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+async def _encode(batches, fields, columns, media_type):
+    if media_type == CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        async for batch in batches:
+            writer.writerows([[row[c] for c in columns] for row in batch])
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        async for batch in batches:
+            yield b"".join(dumps({f: row[c] for f, c in zip(fields, columns)}) + b"\n" for row in batch)
+
+
+def stream_query(query, fields, media_type, columns=None, batch_size=STREAM_BATCH_SIZE):
+    """Diffuse le résultat d'une requête SQL. `columns` donne la colonne lue pour chaque champ."""
+    batches = _query_batches(query, batch_size)
+    return StreamingResponse(_encode(batches, fields, columns or fields, media_type), media_type=media_type)
+
+
+def stream_rows(rows, fields, media_type, columns=None, batch_size=STREAM_BATCH_SIZE):
+    """Même chose pour des lignes déjà en mémoire (moteur d'analytics.py)."""
+    batches = _list_batches(rows, batch_size)
+    return StreamingResponse(_encode(batches, fields, columns or fields, media_type), media_type=media_type)
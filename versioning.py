@@ -0,0 +1,94 @@
+"""Version du jeu de données et ETags des routes GET.
+
+script2.py calcule un hash du contenu des CSV chargés et l'écrit dans la table
+dataset_version. L'API relit cette version (au plus toutes les
+VERSION_POLL_SECONDS secondes) et en dérive des ETags forts : tant que la
+version ne change pas, un client qui renvoie If-None-Match reçoit un 304 sans
+qu'aucune requête SQL ne soit exécutée.
+"""
+import hashlib
+import asyncio
+import os
+import time
+
+from sqlalchemy import text
+
+VERSION_POLL_SECONDS = float(os.getenv("F1_VERSION_POLL_SECONDS", "5"))
+
+VERSION_QUERY = text("SELECT version FROM dataset_version WHERE id = 1")
+# Révision du format des réponses, mêlée aux ETags : à incrémenter quand une
+# réponse change de forme à données égales (ex. rank passé de "1" à 1), sinon
+# les clients gardent leur ancienne copie sur un 304
+API_REVISION = "2"
+
+_version = None
+_checked_at = None
+_updating = False  # callbacks d'un changement de version en cours
+_listeners = []
+
+
+def hash_files(paths):
+    """Hash SHA-256 du contenu des fichiers, dans l'ordre donné."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def on_version_change(callback):
+    """Enregistre une fonction appelée quand la version du jeu de données change."""
+    _listeners.append(callback)
+
+
+async def current_version(async_engine):
+    """Version courante du jeu de données, ou None si la table n'existe pas."""
+    global _version, _checked_at, _updating
+    now = time.monotonic()
+    if _updating or (_checked_at is not None and now - _checked_at < VERSION_POLL_SECONDS):
+        return _version
+    first_check = _checked_at is None
+    _checked_at = now
+    try:
+        async with async_engine.connect() as connection:
+            row = (await connection.execute(VERSION_QUERY)).fetchone()
+        version = row[0] if row else None
+    except Exception:
+        # Base injoignable : la version connue est gardée (ni vidage ni rechargement)
+        return _version
+    if first_check or version == _version:
+        _version = version
+        return version
+    # Les callbacks (vidage du cache, rechargement du moteur...) tournent hors de la
+    # boucle. La nouvelle version n'est publiée qu'après : jusque-là les requêtes
+    # gardent l'ancien ETag, jamais le nouveau sur d'anciennes données.
+    _updating = True
+    try:
+        for callback in _listeners:
+            try:
+                await asyncio.to_thread(callback)
+            except Exception as e:
+                print(f"Warning: version change callback failed: {str(e)}")
+    finally:
+        _updating = False
+    _version = version
+    return version
+
+
+def make_etag(version, *parts):
+    digest = hashlib.sha256("\x00".join([API_REVISION, version, *parts]).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def body_etag(body):
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match utilise la comparaison faible : on ignore le préfixe W/
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]